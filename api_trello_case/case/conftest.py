@@ -0,0 +1,10 @@
+import pytest
+
+from utils.stub_server import StubTrelloServer
+
+
+# 本地假Trello server
+@pytest.fixture
+def stub_server():
+    with StubTrelloServer() as server:
+        yield server
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+import test_trello_api_framework as framework
+from utils.stub_server import StubTrelloServer
+
+
+@pytest.fixture
+def slow_stub_server():
+    with StubTrelloServer(delay=0.02) as server:
+        yield server
+
+
+class TestAsyncRestClient:
+    def test_same_surface_as_rest_client(self, stub_server):
+        async def scenario():
+            async with framework.AsyncRestClient(stub_server.url) as client:
+                created = await client.post("/boards/", params={"name": "async"})
+                board_id = created.json()["id"]
+                fetched = await client.get(f"/boards/{board_id}")
+                updated = await client.put(f"/boards/{board_id}", data={"name": "renamed"})
+                deleted = await client.delete(f"/boards/{board_id}")
+                missing = await client.get(f"/boards/{board_id}")
+                return created, fetched, updated, deleted, missing
+
+        created, fetched, updated, deleted, missing = asyncio.run(scenario())
+        assert isinstance(created, framework.ApiResponse)
+        assert fetched.json()["name"] == "async"
+        assert updated.json()["name"] == "renamed"
+        assert deleted.status_code == 200
+        assert missing.status_code == 404
+
+    def test_bulk_cards_respect_concurrency_limit(self, slow_stub_server):
+        async def scenario():
+            operation = framework.AsyncAPIOperation(slow_stub_server.url, concurrency=8)
+            try:
+                board = await operation.create_trello_board()
+                lists = await operation.create_trello_lists(board.json()["id"], ["a", "b", "c"])
+                cards = await operation.create_trello_cards([res.json()["id"] for res in lists], 40, limit=4)
+                return lists, cards
+            finally:
+                operation.close()
+
+        lists, cards = asyncio.run(scenario())
+        assert [res.json()["name"] for res in cards][:3] == ["card 1", "card 2", "card 3"]
+        assert [res.json()["idList"] for res in cards][:4] == [res.json()["id"] for res in lists] + [lists[0].json()["id"]]
+        assert 1 < slow_stub_server.max_in_flight <= 4
+
+    def test_cards_need_a_list(self, stub_server):
+        async def scenario():
+            operation = framework.AsyncAPIOperation(stub_server.url)
+            try:
+                assert await operation.create_trello_cards([], 0) == []
+                await operation.create_trello_cards([], 3)
+            finally:
+                operation.close()
+
+        with pytest.raises(ValueError, match="list_ids"):
+            asyncio.run(scenario())
+        assert stub_server.request_count == 0
+
+    def test_service_builds_board_fixture(self, slow_stub_server):
+        service = framework.ApiService(slow_stub_server.url)
+        created = service.create_board_with_cards(list_count=5, card_count=50, concurrency=10)
+        assert len(created["lists"]) == 5
+        assert len(created["cards"]) == 50
+        assert {card["idBoard"] for card in created["cards"]} == {created["board"]["id"]}
+        assert len(slow_stub_server.resources["cards"]) == 50
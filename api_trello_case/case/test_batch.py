@@ -0,0 +1,89 @@
+import threading
+
+import test_trello_api_framework as framework
+from test_trello_api_framework import BatchItemResponse, parse_batch_result
+
+
+def create_cards(url, count):
+    service = framework.ApiService(url)
+    return service.create_board_with_cards(list_count=2, card_count=count)
+
+
+class TestGetBatching:
+    def test_cards_read_through_batch(self, stub_server):
+        created = create_cards(stub_server.url, 25)
+        card_ids = [card["id"] for card in created["cards"]]
+        requests_before = stub_server.request_count
+        operation = framework.APIOperation(stub_server.url)
+        responses = operation.get_trello_cards(card_ids + ["missing"])
+        assert stub_server.request_count - requests_before == 3
+        assert [res.json()["id"] for res in responses[:-1]] == card_ids
+        assert all(res.status_code == 200 for res in responses[:-1])
+        assert responses[-1].status_code == 404
+        assert not responses[-1].ok
+
+    def test_params_and_access_inside_scope(self, stub_server):
+        api = framework.API(stub_server.url)
+        board = api.create_board_post({"name": "batched", "key": "k", "token": "t"}).json()
+        with api.batch() as batcher:
+            first = api.get_board(board["id"], {"fields": "name,id", "key": "k", "token": "t"})
+            second = api.get_board("nope", {"key": "k", "token": "t"})
+            assert isinstance(first, BatchItemResponse)
+            # 在scope內讀取會先送出目前收集到的請求
+            assert first.json()["name"] == "batched"
+            third = api.get_board(board["id"], {"key": "k", "token": "t"})
+        assert second.status_code == 404
+        assert third.json()["id"] == board["id"]
+        assert batcher.batch_calls == 2
+        assert stub_server.batch_count == 2
+        # scope外恢復一般GET
+        assert not isinstance(api.get_board(board["id"], {}), BatchItemResponse)
+
+    def test_comma_valued_params_survive_batching(self, stub_server):
+        api = framework.API(stub_server.url)
+        board = api.create_board_post({"name": "看板, 1", "desc": "a&b=c"}).json()
+        with api.batch():
+            item = api.get_board(board["id"], {"fields": "name,desc"})
+            other = api.get_board(board["id"], {"fields": "closed"})
+        assert item.json() == {"id": board["id"], "name": "看板, 1", "desc": "a&b=c"}
+        assert other.json() == {"id": board["id"], "closed": False}
+        assert stub_server.batch_count == 1
+
+    def test_window_collects_requests_from_threads(self, stub_server):
+        api = framework.API(stub_server.url)
+        board_id = api.create_board_post({"name": "window"}).json()["id"]
+        results = []
+        with api.batch(window=0.3) as batcher:
+            def read():
+                results.append(api.get_board(board_id, {}).status_code)
+
+            threads = [threading.Thread(target=read) for _ in range(6)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        assert results == [200] * 6
+        assert batcher.batch_calls == 1
+
+    def test_batch_failure_mapped_to_each_item(self, stub_server):
+        api = framework.API(stub_server.url)
+        stub_server.fail_next(500)
+        api.transport.max_retries = 0
+        with api.batch():
+            items = [api.get_board(str(i), {}) for i in range(3)]
+        assert [item.status_code for item in items] == [500, 500, 500]
+
+    def test_mismatched_batch_length_is_an_error(self, stub_server, monkeypatch):
+        api = framework.API(stub_server.url)
+        board = api.create_board_post({"name": "short"}).json()
+        batch = stub_server.batch
+        monkeypatch.setattr(stub_server, "batch", lambda urls: batch(urls)[:-1])
+        with api.batch():
+            items = [api.get_board(board["id"], {}) for _ in range(3)]
+        assert [item.status_code for item in items] == [502, 502, 502]
+        assert not any(item.ok for item in items)
+
+    def test_parse_batch_result(self):
+        assert parse_batch_result({"200": {"id": "x"}}) == (200, {"id": "x"})
+        assert parse_batch_result({"statusCode": 401, "message": "invalid token"}) == (401, "invalid token")
+        assert parse_batch_result("boom") == (500, "boom")
@@ -0,0 +1,145 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import test_trello_api_framework as framework
+from common.cassette import CassetteMiss, CassettePlayer, CassetteStore, request_key, use_player
+from utils.stub_server import StubTrelloServer
+
+pytest_plugins = ["pytester"]
+
+
+def run_with(player, func):
+    previous = use_player(player)
+    try:
+        return func()
+    finally:
+        use_player(previous)
+
+
+def put_entries(path, worker, count):
+    store = CassetteStore(path)
+    for i in range(count):
+        store.put(f"{worker}-{i}", {"response": {"worker": worker, "n": i, "pad": "x" * (i % 50)}})
+    return store.written
+
+
+class TestCassette:
+    def test_key_ignores_secrets_and_param_order(self):
+        first = request_key("get", "http://a/1/boards/x?key=1&token=2", {"b": 1, "a": 2})
+        second = request_key("GET", "http://b/1/boards/x/", {"a": 2, "b": 1, "token": "other"})
+        assert first == second
+        assert first != request_key("GET", "http://a/1/boards/x", {"a": 3, "b": 1})
+
+    def test_record_then_replay_offline(self, tmp_path):
+        store = CassetteStore(str(tmp_path / "boards"))
+        with StubTrelloServer() as server:
+            url = server.url
+            client = framework.RestClient(url)
+
+            def record():
+                created = client.post("/boards/", params={"name": "rec", "key": "SECRET_KEY", "token": "SECRET_TOKEN"})
+                return created.json(), client.get("/boards/{}".format(created.json()["id"])).json()
+
+            recorded = run_with(CassettePlayer(store, "record", scope="case"), record)
+        data = open(store.data_path, encoding="UTF-8").read()
+        assert "SECRET_KEY" not in data and "SECRET_TOKEN" not in data
+
+        player = CassettePlayer(CassetteStore(store.path), "replay", scope="case")
+        replayed = run_with(player, lambda: (
+            client.post("/boards/", params={"name": "rec", "key": "other", "token": "other"}).json(),
+            client.get("/boards/{}".format(recorded[0]["id"])).json(),
+        ))
+        assert replayed == recorded
+        assert player.hits == 2
+        with pytest.raises(CassetteMiss):
+            run_with(player, lambda: client.get("/boards/unknown"))
+
+    def test_repeated_requests_replay_in_order(self, tmp_path, stub_server):
+        store = CassetteStore(str(tmp_path / "order"))
+        client = framework.RestClient(stub_server.url)
+        board_id = client.post("/boards/", params={"name": "before"}).json()["id"]
+
+        def flow():
+            names = [client.get(f"/boards/{board_id}").json()["name"]]
+            client.put(f"/boards/{board_id}", data={"name": "after"})
+            names.append(client.get(f"/boards/{board_id}").json()["name"])
+            return names
+
+        assert run_with(CassettePlayer(store, "auto"), flow) == ["before", "after"]
+        count = stub_server.request_count
+        assert run_with(CassettePlayer(store, "auto"), flow) == ["before", "after"]
+        assert stub_server.request_count == count
+
+    def test_index_lookup_with_many_entries(self, tmp_path):
+        store = CassetteStore(str(tmp_path / "big"))
+        for i in range(3000):
+            store.put(f"k{i}", {"response": {"n": i}})
+        reopened = CassetteStore(store.path)
+        assert len(reopened) == 3000
+        assert reopened.get("k2999") == {"response": {"n": 2999}}
+        assert reopened.get("missing") is None
+        reopened.close()
+
+    def test_concurrent_processes_append_safely(self, tmp_path):
+        path = str(tmp_path / "shared")
+        with ProcessPoolExecutor(4) as executor:
+            assert list(executor.map(put_entries, [path] * 4, range(4), [1000] * 4)) == [1000] * 4
+        store = CassetteStore(path)
+        assert len(store) == 4000
+        for worker in range(4):
+            for i in range(1000):
+                assert store.get(f"{worker}-{i}")["response"] == {"worker": worker, "n": i, "pad": "x" * (i % 50)}
+        store.close()
+
+    def test_compact_drops_rerecorded_entries(self, tmp_path):
+        store = CassetteStore(str(tmp_path / "tape"))
+        store.put("a", {"response": 1})
+        store.put("b", {"response": 2})
+        store.put("a", {"response": 3})
+        assert store.get("b") == {"response": 2}
+        size = os.path.getsize(store.data_path)
+        assert store.compact() == 1
+        assert store.compact() == 0
+        assert os.path.getsize(store.data_path) < size
+        assert (store.get("a"), store.get("b")) == ({"response": 3}, {"response": 2})
+        reopened = CassetteStore(store.path)
+        assert len(open(reopened.index_path).readlines()) == 2
+        assert (reopened.get("a"), reopened.get("b")) == ({"response": 3}, {"response": 2})
+        store.close()
+        reopened.close()
+
+    def test_rerecording_session_compacts_cassette(self, pytester, stub_server):
+        pytester.makeconftest('pytest_plugins = ["api_trello_case.conftest"]')
+        pytester.makepyfile(test_rerecord=f'''
+            import test_trello_api_framework as framework
+
+            def test_create(trello_cassette):
+                framework.RestClient("{stub_server.url}").post("/boards/", params={{"name": "rec"}})
+        ''')
+        tapes = pytester.path / "tapes"
+        for _ in range(3):
+            result = pytester.runpytest("--cassette-mode=record", "--cassette-dir", str(tapes), "-p", "no:cacheprovider")
+            result.assert_outcomes(passed=1)
+        assert stub_server.request_count == 3
+        assert len((tapes / "test_rerecord" / "index.txt").read_text().splitlines()) == 1
+        assert len((tapes / "test_rerecord" / "data.jsonl").read_text().splitlines()) == 1
+
+    def test_marker_switches_mode_per_test(self, pytester):
+        pytester.makeconftest('pytest_plugins = ["api_trello_case.conftest"]')
+        pytester.makepyfile(test_marked='''
+            import pytest
+
+            @pytest.mark.cassette("shared", mode="replay")
+            def test_replay(trello_cassette):
+                assert trello_cassette.mode == "replay"
+                assert trello_cassette.store.path.endswith("shared")
+
+            def test_default(trello_cassette):
+                assert trello_cassette.mode == "auto"
+        ''')
+        result = pytester.runpytest("--cassette-mode=auto", "--cassette-dir", str(pytester.path / "tapes"),
+                                    "-p", "no:cacheprovider")
+        result.assert_outcomes(passed=2)
+        assert not os.path.exists(pytester.path / "tapes")
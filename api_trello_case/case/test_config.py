@@ -0,0 +1,81 @@
+import os
+import threading
+from configparser import NoOptionError, NoSectionError
+
+import pytest
+
+from config.config import Settings
+
+
+@pytest.fixture
+def ini_file(tmp_path):
+    path = tmp_path / "trello_env.ini"
+    path.write_text("[trello]\nurl = http://a\ntimeout = 5\nverbose = yes\n"
+                    "[trello:staging]\nurl = http://staging\n", encoding="UTF-8")
+    return path
+
+
+class TestSettings:
+    def test_parsed_once_across_threads(self, ini_file):
+        settings = Settings(str(ini_file), env="", check_interval=60)
+        threads = [threading.Thread(target=lambda: [settings.get("trello", "url") for _ in range(200)])
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert settings.parse_count == 1
+
+    def test_reload_between_check_and_return(self, ini_file):
+        # 在fast path檢查完check_interval之後、回傳之前插入一次reload()
+        class RacingSettings(Settings):
+            race = False
+
+            @property
+            def check_interval(self):
+                if self.race:
+                    self.race = False
+                    self.reload()
+                return 60
+
+            @check_interval.setter
+            def check_interval(self, value):
+                pass
+
+        settings = RacingSettings(str(ini_file), env="")
+        assert settings.get("trello", "url") == "http://a"
+        settings.race = True
+        assert settings.get("trello", "url") == "http://a"
+        assert settings.get("trello", "url") == "http://a"
+        assert settings.parse_count == 2
+
+    def test_reloads_on_mtime_change(self, ini_file):
+        settings = Settings(str(ini_file), env="", check_interval=0)
+        assert settings.get("trello", "url") == "http://a"
+        ini_file.write_text("[trello]\nurl = http://b\n", encoding="UTF-8")
+        stat = os.stat(ini_file)
+        os.utime(ini_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert settings.get("trello", "url") == "http://b"
+        assert settings.get("trello", "url") == "http://b"
+        assert settings.parse_count == 2
+
+    def test_env_section_and_variable_override(self, ini_file, monkeypatch):
+        settings = Settings(str(ini_file), env="staging")
+        assert settings.get("trello", "url") == "http://staging"
+        assert settings.get("trello", "timeout") == "5"
+        monkeypatch.setenv("TRELLO_URL", "http://env")
+        assert settings.get("trello", "url") == "http://env"
+
+    def test_typed_accessors(self, ini_file):
+        settings = Settings(str(ini_file), env="")
+        assert settings.get_int("trello", "timeout") == 5
+        assert settings.get_float("trello", "timeout") == 5.0
+        assert settings.get_bool("trello", "verbose") is True
+        assert settings.get_int("trello", "retries", fallback=3) == 3
+
+    def test_missing_values_raise_like_configparser(self, ini_file):
+        settings = Settings(str(ini_file), env="")
+        with pytest.raises(NoSectionError):
+            settings.get("jira", "url")
+        with pytest.raises(NoOptionError):
+            settings.get("trello", "missing")
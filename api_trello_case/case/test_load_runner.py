@@ -0,0 +1,75 @@
+import io
+import json
+
+import pytest
+
+import test_trello_api_framework as framework
+from common.logger import logger
+from utils import load_runner
+
+
+class TestLoadRunner:
+    def test_thread_mode_end_to_end(self, stub_server, tmp_path, monkeypatch):
+        def fail(*args, **kwargs):
+            raise AssertionError("load path must not build allure/curl attachments")
+
+        monkeypatch.setattr(framework.curlify, "to_curl", fail)
+        monkeypatch.setattr(framework, "ALLURE_ATTACH_MODE", "always")
+        out = io.StringIO()
+        report_path = tmp_path / "load.json"
+        report = load_runner.main(["--url", stub_server.url, "--users", "3", "--ramp-up", "0.2", "--duration", "0.6",
+                                   "--report-interval", "0.2", "--json", str(report_path)], out=out)
+        assert report["iterations"] > 0
+        assert report["iterations"] == len(stub_server.boards)
+        assert report["errors"] == 0
+        assert report["endpoints"]["POST /boards"]["count"] == report["iterations"]
+        assert json.loads(report_path.read_text(encoding="UTF-8"))["iterations"] == report["iterations"]
+        assert "it/s" in out.getvalue() and "scenario latency" in out.getvalue()
+        assert framework.ALLURE_ATTACH_MODE == "always"
+
+    def test_async_mode_counts_errors(self, stub_server):
+        stub_server.fail_next(500, count=3)
+        report = load_runner.main(["--url", stub_server.url, "--mode", "async", "--users", "4", "--duration", "0.4",
+                                   "--report-interval", "1"], out=io.StringIO())
+        assert report["errors"] == 3
+        assert report["iterations"] == len(stub_server.boards) + 3
+        assert 0 < report["error_rate"] < 1
+
+    def test_custom_scenario_with_args_end_to_end(self, stub_server):
+        board_id = framework.APIOperation(stub_server.url).create_trello_board().json()["id"]
+        report = load_runner.main(["--url", stub_server.url, "--users", "2", "--duration", "0.3",
+                                   "--report-interval", "1", "--args", json.dumps([board_id, "load list"]),
+                                   "--scenario", "test_trello_api_framework:APIOperation.create_trello_list"],
+                                  out=io.StringIO())
+        lists = list(stub_server.resources["lists"].values())
+        assert report["errors"] == 0
+        assert report["iterations"] == len(lists) > 0
+        assert report["endpoints"]["POST /lists"]["count"] == report["iterations"]
+        assert {(item["idBoard"], item["name"]) for item in lists} == {(board_id, "load list")}
+
+    def test_custom_async_scenario_with_kwargs(self, stub_server):
+        board_id = framework.APIOperation(stub_server.url).create_trello_board().json()["id"]
+        flow_factory, close = load_runner.resolve_scenario(
+            "test_trello_api_framework:AsyncAPIOperation.create_trello_lists", stub_server.url, "async", 2,
+            kwargs={"board_id": board_id, "names": ["first", "second"]})
+        report = load_runner.LoadRunner(flow_factory, users=2, duration=0.2, mode="async", report_interval=1,
+                                        out=io.StringIO()).run()
+        close()
+        assert report["errors"] == 0
+        assert report["iterations"] * 2 == len(stub_server.resources["lists"]) > 0
+
+    def test_scenario_missing_args_is_rejected(self, stub_server):
+        with pytest.raises(ValueError, match="create_trello_list"):
+            load_runner.resolve_scenario(
+                "test_trello_api_framework:APIOperation.create_trello_list", stub_server.url, "thread", 1)
+
+    def test_exceptions_counted_as_errors(self):
+        def broken():
+            raise RuntimeError("boom")
+
+        level = logger.level
+        runner = load_runner.LoadRunner(lambda: broken, users=2, duration=0.1, report_interval=1, out=io.StringIO())
+        report = runner.run()
+        assert report["iterations"] == report["errors"] > 0
+        assert report["error_rate"] == 1
+        assert logger.level == level
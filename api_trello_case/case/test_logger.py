@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+
+from common.logger import BatchFileHandler, Logger, LazyJson
+
+
+def read_lines(path):
+    with open(path, encoding="UTF-8") as f:
+        return f.read().splitlines()
+
+
+class TestLogger:
+    def test_recreate_does_not_duplicate_handlers(self, tmp_path):
+        Logger("CaseLogSync", str(tmp_path))
+        log = Logger("CaseLogSync", str(tmp_path))
+        log.logger.info("only once")
+        log.filelogger.flush()
+        assert len(log.logger.handlers) == 1
+        assert len([line for line in read_lines(log.logname) if "only once" in line]) == 1
+
+    def test_queue_mode_writes_in_background(self, tmp_path):
+        Logger("CaseLogQueue", str(tmp_path), mode="queue")
+        log = Logger("CaseLogQueue", str(tmp_path), mode="queue")
+        for i in range(1000):
+            log.logger.info("line %s", i)
+        Logger._writers.pop("CaseLogQueue").stop()
+        lines = read_lines(log.logname)
+        assert len(lines) == 1000
+        assert lines[-1].endswith("line 999")
+
+    def test_batch_file_handler_rotates_by_size(self, tmp_path):
+        handler = BatchFileHandler(str(tmp_path / "rotate.log"), max_bytes=200, backup_count=2)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        record = logging.makeLogRecord({"msg": "x" * 99, "levelno": logging.INFO})
+        for _ in range(5):
+            handler.emit_batch([record])
+        handler.close()
+        files = sorted(p.name for p in tmp_path.iterdir())
+        assert files[0] == "rotate.log"
+        assert len(files) == 3
+        assert read_lines(tmp_path / "rotate.log") == ["x" * 99]
+
+    def test_batch_file_handler_counts_bytes(self, tmp_path):
+        handler = BatchFileHandler(str(tmp_path / "bytes.log"), max_bytes=200, backup_count=2)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        record = logging.makeLogRecord({"msg": "看板" * 20, "levelno": logging.INFO})
+        handler.emit_batch([record])
+        handler.emit_batch([record])
+        handler.close()
+        assert len(list(tmp_path.iterdir())) == 2
+        assert handler.size == os.path.getsize(tmp_path / "bytes.log") == 121
+
+    def test_queue_mode_file_per_xdist_worker(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("PYTEST_XDIST_WORKER", "gw3")
+        log = Logger("CaseLogWorker", str(tmp_path), mode="queue")
+        Logger._writers.pop("CaseLogWorker").stop()
+        assert os.path.basename(log.logname) == "CaseLogWorker_gw3.log"
+
+    def test_jsonl_format(self, tmp_path):
+        log = Logger("CaseLogJson", str(tmp_path), mode="queue", fmt="jsonl")
+        log.logger.info("api request params ==>> %s", LazyJson({"name": "board"}))
+        log.logger.warning("status code ==>> %s", 429)
+        Logger._writers.pop("CaseLogJson").stop()
+        first, second = [json.loads(line) for line in read_lines(log.logname)]
+        assert first["msg"] == "api request params"
+        assert first["data"] == {"name": "board"}
+        assert second["level"] == logging.getLevelName(logging.WARNING)
+        assert second["msg"] == "status code ==>> 429"
+
+    def test_queue_mode_logs_payload_as_it_was_when_logged(self, tmp_path):
+        log = Logger("CaseLogSnapshot", str(tmp_path), mode="queue", fmt="jsonl")
+        payload = {"name": "board"}
+        for i in range(100):
+            log.logger.info("api request params ==>> %s", LazyJson(payload))
+            payload["name"] = "renamed {}".format(i)
+            payload["extra{}".format(i)] = i
+        Logger._writers.pop("CaseLogSnapshot").stop()
+        lines = [json.loads(line) for line in read_lines(log.logname)]
+        assert len(lines) == 100
+        assert lines[0]["data"] == {"name": "board"}
+        assert lines[-1]["data"] == dict({"name": "renamed 98"}, **{"extra{}".format(i): i for i in range(99)})
+
+    def test_json_text_parsed_by_writer(self, tmp_path):
+        log = Logger("CaseLogText", str(tmp_path), mode="queue", fmt="jsonl")
+        log.logger.info("api response json ==>> %s", LazyJson.from_text('[{"name": "看板"}]'))
+        log.logger.info("api response json ==>> %s", LazyJson.from_text("not json"))
+        Logger._writers.pop("CaseLogText").stop()
+        first, second = [json.loads(line) for line in read_lines(log.logname)]
+        assert first["data"] == [{"name": "看板"}]
+        assert second["data"] == "not json"
+        assert str(LazyJson.from_text('{"a": 1}')) == '{\n    "a": 1\n}'
+        assert str(LazyJson.from_text("not json")) == "not json"
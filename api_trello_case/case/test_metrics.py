@@ -0,0 +1,64 @@
+import json
+
+import test_trello_api_framework as framework
+from common import metrics
+
+pytest_plugins = ["pytester"]
+
+
+class TestMetrics:
+    def test_endpoint_template(self):
+        board_id = "5f0c1a2b3c4d5e6f7a8b9c0d"
+        assert metrics.endpoint_template(f"https://api.trello.com/1/boards/{board_id}", "/1") == "/boards/{id}"
+        assert metrics.endpoint_template(f"http://h/1/boards/{board_id}/lists?x=1", "/1") == "/boards/{id}/lists"
+        assert metrics.endpoint_template("http://h/1/cards/AbCd1234/checklists", "/1") == "/cards/{id}/checklists"
+        assert metrics.endpoint_template("http://h/1/boards/", "/1") == "/boards"
+
+    def test_percentiles_and_histogram(self):
+        values = list(range(1, 101))
+        assert metrics.percentile(values, 50) == 50
+        assert metrics.percentile(values, 95) == 95
+        assert metrics.percentile(values, 99) == 99
+        assert metrics.percentile([], 50) == 0.0
+        assert metrics.histogram([5, 30, 20000]) == dict(metrics.histogram([]), **{"<=10": 1, "<=50": 1, ">10000": 1})
+
+    def test_rest_client_emits_samples(self, stub_server):
+        collector = metrics.MetricsCollector()
+        metrics.add_listener(collector)
+        try:
+            client = framework.RestClient(stub_server.url)
+            board_id = client.post("/boards/", params={"name": "m"}).json()["id"]
+            client.get(f"/boards/{board_id}")
+            client.get("/boards/missing")
+        finally:
+            metrics.remove_listener(collector)
+        report = collector.report()
+        assert report["endpoints"]["GET /boards/{id}"]["count"] == 2
+        assert report["endpoints"]["GET /boards/{id}"]["errors"] == 1
+        assert report["endpoints"]["POST /boards"]["response_bytes"] > 0
+        assert sum(test["requests"] for test in report["tests"].values()) == 3
+
+    def test_merge_worker_data(self):
+        first, second = metrics.MetricsCollector(), metrics.MetricsCollector()
+        for collector, total in ((first, 0.01), (second, 0.03)):
+            collector.add(metrics.RequestSample("GET", "/boards/{id}", 200, total, total / 2, 0, 10, nodeid="t"))
+        first.merge(second.raw())
+        report = first.report()
+        assert report["endpoints"]["GET /boards/{id}"]["count"] == 2
+        assert report["tests"]["t"] == {"requests": 2, "total_ms": 40.0}
+
+    def test_plugin_writes_report(self, pytester, stub_server):
+        pytester.makeconftest('pytest_plugins = ["api_trello_case.conftest"]')
+        pytester.makepyfile(test_perf=f'''
+            import test_trello_api_framework as framework
+
+            def test_create_board():
+                framework.ApiService("{stub_server.url}").create_board_use_post()
+        ''')
+        report_path = pytester.path / "perf.json"
+        result = pytester.runpytest("--perf-report", str(report_path), "-p", "no:cacheprovider")
+        result.assert_outcomes(passed=1)
+        result.stdout.fnmatch_lines(["*api performance*", "POST /boards*"])
+        report = json.loads(report_path.read_text(encoding="UTF-8"))
+        assert report["endpoints"]["POST /boards"]["count"] == 1
+        assert list(report["tests"]) == ["test_perf.py::test_create_board"]
@@ -0,0 +1,149 @@
+import threading
+
+import pytest
+
+import test_trello_api_framework as framework
+from api_trello_case.conftest.resource_pool import TrelloBoardPool
+
+pytest_plugins = ["pytester"]
+
+
+def make_pool(url, tmp_path, worker_id, **options):
+    return TrelloBoardPool(url, str(tmp_path), "run", worker_id=worker_id, **options)
+
+
+class TestTrelloBoardPool:
+    def test_workers_share_one_provisioning(self, stub_server, tmp_path):
+        first = make_pool(stub_server.url, tmp_path, "gw0", size=2, list_count=2)
+        second = make_pool(stub_server.url, tmp_path, "gw1", size=2, list_count=2)
+        assert first.start() == second.start()
+        assert len(stub_server.boards) == 2
+        assert len(stub_server.resources["lists"]) == 4
+
+        leased = [first.lease(), second.lease()]
+        assert leased[0]["id"] != leased[1]["id"]
+        assert first.finish() == []
+        assert len(stub_server.boards) == 2
+        assert sorted(second.finish()) == sorted(board["id"] for board in leased)
+        assert stub_server.boards == {}
+
+    def test_release_resets_board(self, stub_server, tmp_path):
+        pool = make_pool(stub_server.url, tmp_path, "master", size=1, list_count=1)
+        pool.start()
+        board = pool.lease()
+        operation = framework.APIOperation(stub_server.url)
+        operation.create_trello_card(board["lists"][0]["id"], "leftover")
+        operation.create_trello_list(board["id"], "extra")
+        operation.api.update_board_put(board["id"], {"name": "renamed"})
+
+        pool.release(board)
+        again = pool.lease()
+        api = operation.api
+        assert again["id"] == board["id"]
+        assert api.get_board_cards(board["id"], {}).json() == []
+        assert [item["id"] for item in api.get_board_lists(board["id"], {}).json()] == [board["lists"][0]["id"]]
+        assert api.get_board(board["id"], {}).json()["name"] == board["name"]
+        pool.finish()
+
+    def test_lease_waits_for_free_board(self, stub_server, tmp_path):
+        pool = make_pool(stub_server.url, tmp_path, "master", size=1)
+        pool.start()
+        board = pool.lease()
+        timer = threading.Timer(0.2, pool.release, args=(board,))
+        timer.start()
+        assert pool.lease()["id"] == board["id"]
+        timer.join()
+        pool.finish()
+
+    def test_failed_reset_frees_lease_and_retires_board(self, stub_server, tmp_path):
+        pool = make_pool(stub_server.url, tmp_path, "master", size=2, list_count=1, lease_timeout=1.0)
+        pool.start()
+        board = pool.lease()
+        other = pool.lease()
+        framework.APIOperation(stub_server.url).create_trello_card(board["lists"][0]["id"], "leftover")
+        stub_server.fail_next(403, method="DELETE")
+        with pytest.raises(framework.requests.HTTPError):
+            pool.release(board)
+        state = pool._load()
+        assert [(item["leased_by"], item["broken"]) for item in state["boards"] if item["id"] == board["id"]] == [
+            (None, True)]
+        pool.release(other)
+        assert pool.lease()["id"] == other["id"]
+        pool.release(other)
+        assert sorted(pool.finish()) == sorted([board["id"], other["id"]])
+
+    def test_lease_fails_fast_when_every_board_is_broken(self, stub_server, tmp_path):
+        pool = make_pool(stub_server.url, tmp_path, "master", size=1)
+        pool.start()
+        board = pool.lease()
+        stub_server.fail_next(404, count=2)
+        with pytest.raises(framework.requests.HTTPError):
+            pool.release(board)
+        with pytest.raises(RuntimeError, match="failed to reset"):
+            pool.lease()
+        pool.finish()
+
+    def test_failed_delete_keeps_board_in_state(self, stub_server, tmp_path):
+        pool = make_pool(stub_server.url, tmp_path, "master", size=2)
+        boards = pool.start()
+        stub_server.fail_next(403, method="DELETE")
+        deleted = pool.finish()
+        assert len(deleted) == 1
+        leaked = pool._load()["boards"]
+        assert [board["id"] for board in leaked] == [board["id"] for board in boards if board["id"] not in deleted]
+        assert list(stub_server.boards) == [leaked[0]["id"]]
+
+    def test_worker_joins_pool_before_first_test(self, pytester, stub_server):
+        # xdist的worker可能在其他worker第一次用到fixture前就跑完, 所以要在collection階段就加入
+        pytester.makeconftest('pytest_plugins = ["api_trello_case.conftest"]')
+        pytester.makepyfile(test_join='''
+            import json
+
+            def test_without_board(request):
+                pool = request.config.trello_board_pool
+                with open(pool.state_path, encoding="UTF-8") as f:
+                    assert json.load(f)["workers"] == ["master"]
+
+            def test_with_board(trello_board):
+                assert trello_board["id"]
+        ''')
+        result = pytester.runpytest("--trello-url", stub_server.url, "-p", "no:cacheprovider")
+        result.assert_outcomes(passed=2)
+        assert stub_server.boards == {}
+
+    def test_no_boards_when_pool_tests_are_not_run(self, pytester, stub_server):
+        pytester.makeconftest('pytest_plugins = ["api_trello_case.conftest"]')
+        pytester.makepyfile(test_skip_pool='''
+            def test_plain():
+                pass
+
+            def test_with_board(trello_board):
+                pass
+        ''')
+        pytester.runpytest("--trello-url", stub_server.url, "--collect-only", "-p", "no:cacheprovider")
+        result = pytester.runpytest("--trello-url", stub_server.url, "-k", "plain", "-p", "no:cacheprovider")
+        result.assert_outcomes(passed=1, deselected=1)
+        assert stub_server.request_count == 0
+
+    def test_fixture_reuses_board_between_tests(self, pytester, stub_server):
+        pytester.makeconftest('pytest_plugins = ["api_trello_case.conftest"]')
+        pytester.makepyfile(test_pool=f'''
+            import test_trello_api_framework as framework
+
+            seen = []
+
+            def test_first(trello_board):
+                seen.append(trello_board["id"])
+                operation = framework.APIOperation("{stub_server.url}")
+                operation.create_trello_card(trello_board["lists"][0]["id"], "temp")
+
+            def test_second(trello_board):
+                assert seen == [trello_board["id"]]
+                cards = framework.API("{stub_server.url}").get_board_cards(trello_board["id"], {{}}).json()
+                assert cards == []
+        ''')
+        result = pytester.runpytest("--trello-url", stub_server.url, "--trello-pool-lists", "1",
+                                    "-p", "no:cacheprovider")
+        result.assert_outcomes(passed=2)
+        assert stub_server.boards == {}
+        assert stub_server.resources["cards"] == {}
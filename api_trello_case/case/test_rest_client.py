@@ -0,0 +1,77 @@
+import logging
+
+import pytest
+
+import test_trello_api_framework as framework
+from common.logger import logger
+
+
+class TestRestClientResponse:
+    def test_json_decoded_once(self, stub_server, monkeypatch):
+        calls = []
+        original = framework.requests.Response.json
+
+        def counting_json(self, **kwargs):
+            calls.append(1)
+            return original(self, **kwargs)
+
+        monkeypatch.setattr(framework.requests.Response, "json", counting_json)
+        monkeypatch.setattr(framework, "ALLURE_ATTACH_MODE", "always")
+        client = framework.RestClient(stub_server.url)
+        res = client.post("/boards/", params={"name": "board"})
+        assert res.status_code == 200
+        assert res.json()["name"] == "board"
+        assert res.json() is res.json()
+        assert len(calls) == 1
+
+    def test_decode_error_is_cached(self, stub_server):
+        client = framework.RestClient(stub_server.url)
+        res = client.get("/boards/missing")
+        assert res.status_code == 404
+        with pytest.raises(framework.requests.exceptions.JSONDecodeError):
+            res.json()
+        assert res.text.startswith("The requested resource")
+
+    def test_nothing_serialized_when_quiet(self, stub_server, monkeypatch):
+        def fail(*args, **kwargs):
+            raise AssertionError("serialized while logging/allure disabled")
+
+        monkeypatch.setattr(framework, "ALLURE_ATTACH_MODE", "off")
+        monkeypatch.setattr(framework.LazyJson, "__str__", fail)
+        monkeypatch.setattr(framework.curlify, "to_curl", fail)
+        level = logger.level
+        logger.setLevel(logging.WARNING)
+        try:
+            client = framework.RestClient(stub_server.url)
+            res = client.post("/boards/", params={"name": "board"}, cookies={"c": "1"})
+        finally:
+            logger.setLevel(level)
+        assert res.json()["name"] == "board"
+
+    def test_decode_error_logged_when_quiet(self, stub_server, caplog):
+        level = logger.level
+        logger.setLevel(logging.WARNING)
+        try:
+            client = framework.RestClient(stub_server.url)
+            client.post("/boards/", params={"name": "board"})
+            client.get("/boards/missing")
+        finally:
+            logger.setLevel(level)
+        assert [(r.levelno, r.getMessage()) for r in caplog.records] == [
+            (logging.ERROR, "Json decode error, json text is==>> The requested resource was not found.")]
+
+    def test_allure_auto_mode_follows_listener(self, monkeypatch):
+        monkeypatch.setattr(framework, "ALLURE_ATTACH_MODE", "auto")
+
+        class Listener:
+            @framework.allure_commons.hookimpl
+            def attach_data(self, body, name, attachment_type, extension):
+                pass
+
+        assert framework.allure_attach_enabled() is False
+        listener = Listener()
+        framework.allure_commons.plugin_manager.register(listener)
+        try:
+            assert framework.allure_attach_enabled() is True
+        finally:
+            framework.allure_commons.plugin_manager.unregister(listener)
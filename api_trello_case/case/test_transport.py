@@ -0,0 +1,75 @@
+import pytest
+import requests
+
+import test_trello_api_framework as framework
+from common.transport import RateLimiter, TokenBucket, Transport, parse_retry_after
+
+
+def make_client(url, **options):
+    waits = []
+    options.setdefault("rate_limiter", None)
+    transport = Transport(backoff_factor=0.1, sleep=waits.append, **options)
+    return framework.RestClient(url, transport), waits
+
+
+class TestTransport:
+    def test_token_bucket_paces_after_burst(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+        assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+    def test_rate_limiter_uses_strictest_bucket(self):
+        limiter = RateLimiter(key_limit=300, token_limit=1, window=10)
+        assert limiter.reserve("key", "token") == 0
+        assert limiter.reserve("key", "token") == pytest.approx(10, abs=0.1)
+        assert limiter.reserve("key", "other-token") == 0
+
+    def test_429_respects_retry_after(self, stub_server):
+        stub_server.fail_next(429, count=2, headers={"Retry-After": "2"})
+        client, waits = make_client(stub_server.url)
+        res = client.post("/boards/", params={"name": "paced"})
+        assert res.status_code == 200
+        assert waits == [2.0, 2.0]
+        assert res.retries == 2
+        assert res.throttle_wait == 4.0
+
+    def test_server_errors_retried_only_for_idempotent_methods(self, stub_server):
+        client, waits = make_client(stub_server.url, max_retries=3)
+        stub_server.fail_next(503)
+        assert client.post("/boards/", params={"name": "once"}).status_code == 503
+        board_id = client.post("/boards/", params={"name": "board"}).json()["id"]
+        stub_server.fail_next(503, count=2)
+        res = client.get(f"/boards/{board_id}")
+        assert res.status_code == 200
+        assert res.retries == 2
+        assert res.stats.backoff_wait == pytest.approx(sum(waits))
+        assert 0.09 <= waits[0] <= 0.1 and 0.18 <= waits[1] <= 0.2
+
+    def test_gives_up_after_max_retries(self, stub_server):
+        stub_server.fail_next(429, count=5)
+        client, waits = make_client(stub_server.url, max_retries=2)
+        res = client.get("/boards/anything")
+        assert res.status_code == 429
+        assert res.retries == 2
+
+    def test_connection_errors_retried_then_raised(self):
+        client, waits = make_client("http://127.0.0.1:9/1", max_retries=2, connect_timeout=0.5)
+        with pytest.raises(requests.exceptions.ConnectionError):
+            client.get("/boards/x")
+        assert len(waits) == 2
+
+    def test_limiter_wait_reported(self, stub_server):
+        limiter = RateLimiter(key_limit=1, token_limit=0, window=1)
+        client, waits = make_client(stub_server.url, rate_limiter=limiter)
+        client.post("/boards/", params={"name": "a", "key": "k"})
+        res = client.post("/boards/", params={"name": "b", "key": "k"})
+        assert res.retries == 0
+        assert res.throttle_wait == pytest.approx(1, abs=0.05)
+
+    def test_parse_retry_after(self):
+        assert parse_retry_after("3") == 3.0
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+        assert parse_retry_after("soon") is None
+        assert parse_retry_after(None) is None
@@ -0,0 +1,187 @@
+import json
+import os
+import tempfile
+import time
+import uuid
+
+import allure
+import pytest
+
+from common import metrics
+from common.cassette import MODES, CassettePlayer, CassetteStore, use_player
+from .resource_pool import TrelloBoardPool
+
+BasePath = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("trello")
+    group.addoption("--cassette-mode", choices=MODES, default=os.getenv("CASSETTE_MODE", "off"),
+                    help="off: 打真的api / record: 錄製 / replay: 只用cassette / auto: 有紀錄就回放, 沒有就錄製")
+    group.addoption("--cassette-dir", default=os.path.join(BasePath, "cassettes"),
+                    help="cassette存放目錄")
+    group.addoption("--perf-report", metavar="PATH", default=os.getenv("PERF_REPORT"),
+                    help="記錄每個endpoint的耗時, 結束時輸出摘要並寫入json檔")
+    group.addoption("--trello-url", default=None, help="覆蓋trello_env.ini的api url(例如本地stub server)")
+    group.addoption("--trello-pool-size", type=int,
+                    default=int(os.getenv("PYTEST_XDIST_WORKER_COUNT", 1)),
+                    help="session開始時預先建立的看板數(預設為xdist worker數)")
+    group.addoption("--trello-pool-lists", type=int, default=0, help="每個看板預先建立的列表數")
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "cassette(name=None, mode=None): 指定這個case使用的cassette名稱與模式(覆蓋--cassette-mode)")
+    config.cassette_stores = {}
+    # 這次session有錄製的cassette目錄(xdist時由controller彙總), 結束時壓縮
+    config.cassette_recorded = set()
+    config.perf_collector = None
+    config.trello_board_pool = None
+    if config.getoption("perf_report"):
+        config.perf_collector = metrics.MetricsCollector()
+        metrics.add_listener(config.perf_collector)
+
+
+def pytest_unconfigure(config):
+    for store in getattr(config, "cassette_stores", {}).values():
+        store.close()
+    # worker結束時其他worker可能還在讀寫, 只由controller(或沒有xdist時的本身)在最後壓縮
+    if not hasattr(config, "workerinput"):
+        for path in sorted(getattr(config, "cassette_recorded", ())):
+            CassetteStore(path).compact()
+    if getattr(config, "perf_collector", None) is not None:
+        metrics.remove_listener(config.perf_collector)
+
+
+# 讓量測結果帶上目前的測試node id
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    metrics.current_nodeid[0] = item.nodeid
+    try:
+        yield
+    finally:
+        metrics.current_nodeid[0] = None
+
+
+# session結束前把這個process的效能摘要附加到allure
+@pytest.fixture(scope="session", autouse=True)
+def trello_perf_report(request):
+    yield
+    collector = request.config.perf_collector
+    if collector is None or not collector.endpoints:
+        return
+    report = collector.report()
+    allure.attach(metrics.format_report(report), "api performance report", allure.attachment_type.TEXT)
+    allure.attach(json.dumps(report, indent=4, ensure_ascii=False), "api performance report json",
+                  allure.attachment_type.JSON)
+
+
+# pytest-xdist: controller合併各worker的原始資料與錄製過的cassette
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    workeroutput = getattr(node, "workeroutput", {})
+    node.config.cassette_recorded.update(workeroutput.get("cassette_recorded", ()))
+    collector = node.config.perf_collector
+    raw = workeroutput.get("perf_metrics")
+    if collector is not None and raw:
+        collector.merge(raw)
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    if config.trello_board_pool is not None:
+        config.trello_board_pool.finish()
+        config.trello_board_pool = None
+    config.cassette_recorded.update(path for path, store in config.cassette_stores.items() if store.written)
+    if hasattr(config, "workerinput"):
+        config.workeroutput["cassette_recorded"] = sorted(config.cassette_recorded)
+    collector = config.perf_collector
+    if collector is None:
+        return
+    if hasattr(config, "workerinput"):
+        config.workeroutput["perf_metrics"] = collector.raw()
+        return
+    report = collector.report()
+    report["created"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    with open(config.getoption("perf_report"), "w", encoding="UTF-8") as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    collector = config.perf_collector
+    if collector is None or hasattr(config, "workerinput") or not collector.endpoints:
+        return
+    terminalreporter.write_sep("=", "api performance")
+    terminalreporter.write_line(metrics.format_report(collector.report()))
+    terminalreporter.write_line("report written to {}".format(config.getoption("perf_report")))
+
+
+# 依marker/CLI啟用cassette, 預設每個測試模組一個cassette
+@pytest.fixture(autouse=True)
+def trello_cassette(request):
+    mode = request.config.getoption("cassette_mode")
+    name = None
+    marker = request.node.get_closest_marker("cassette")
+    if marker is not None:
+        name = marker.kwargs.get("name") or (marker.args[0] if marker.args else None)
+        mode = marker.kwargs.get("mode") or mode
+    if mode == "off":
+        yield None
+        return
+    name = name or request.node.path.stem
+    path = os.path.join(request.config.getoption("cassette_dir"), name)
+    stores = request.config.cassette_stores
+    if path not in stores:
+        stores[path] = CassetteStore(path)
+    player = CassettePlayer(stores[path], mode, scope=request.node.nodeid)
+    previous = use_player(player)
+    try:
+        yield player
+    finally:
+        use_player(previous)
+
+
+def make_board_pool(config):
+    import test_trello_api_framework as framework
+
+    pool = TrelloBoardPool(
+        api_url=config.getoption("trello_url") or framework.trello_URL,
+        state_dir=os.path.join(tempfile.gettempdir(), "trello_board_pool"),
+        run_id=os.getenv("PYTEST_XDIST_TESTRUNUID") or uuid.uuid4().hex,
+        worker_id=os.getenv("PYTEST_XDIST_WORKER", "master"),
+        size=config.getoption("trello_pool_size"),
+        list_count=config.getoption("trello_pool_lists"),
+        name=framework.trello_Board_name,
+    )
+    pool.start()
+    return pool
+
+
+# 有case(-k/-m篩選後)用到看板池時, 每個worker在collection結束時就加入pool;
+# xdist要等所有worker回報collection才分派測試, tryfirst確保在回報前加入,
+# 先跑完的worker不會把還沒加入的worker的看板刪掉. --collect-only不建立看板
+@pytest.hookimpl(tryfirst=True)
+def pytest_collection_finish(session):
+    config = session.config
+    if config.option.collectonly or config.trello_board_pool is not None:
+        return
+    if any("trello_board_pool" in getattr(item, "fixturenames", ()) for item in session.items):
+        config.trello_board_pool = make_board_pool(config)
+
+
+# 預先建立的看板池, xdist的worker透過狀態檔共用, session結束時由pytest_sessionfinish離開
+@pytest.fixture(scope="session")
+def trello_board_pool(request):
+    config = request.config
+    if config.trello_board_pool is None:
+        # 透過getfixturevalue動態使用時collection階段看不到, 這時才加入
+        config.trello_board_pool = make_board_pool(config)
+    return config.trello_board_pool
+
+
+# 從看板池租借一個看板, 測試結束後還原並歸還
+@pytest.fixture
+def trello_board(trello_board_pool):
+    board = trello_board_pool.lease()
+    yield board
+    trello_board_pool.release(board)
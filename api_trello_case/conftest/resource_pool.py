@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+import time
+
+from common.file_lock import FileLock
+from common.logger import logger
+
+
+# 整個測試session共用的看板池: 開始時一次建立, 測試間租借/還原, 最後一個worker結束時全部刪除
+class TrelloBoardPool:
+    def __init__(self, api_url, state_dir, run_id, worker_id="master", size=1, list_count=0,
+                 name="My_test_board", concurrency=10, lease_timeout=300.0):
+        self.api_url = api_url
+        self.worker_id = worker_id
+        self.size = size
+        self.list_count = list_count
+        self.name = name
+        self.concurrency = concurrency
+        self.lease_timeout = lease_timeout
+        os.makedirs(state_dir, exist_ok=True)
+        self.state_path = os.path.join(state_dir, "board_pool_{}.json".format(run_id))
+        self.lock = FileLock(self.state_path + ".lock")
+
+    def _operation(self):
+        # 延遲import, 沒用到pool的session不需要載入api層
+        from test_trello_api_framework import AsyncAPIOperation
+        return AsyncAPIOperation(self.api_url, self.concurrency)
+
+    def _run(self, work):
+        async def main():
+            operation = self._operation()
+            try:
+                return await work(operation)
+            finally:
+                operation.close()
+
+        return asyncio.run(main())
+
+    def _load(self):
+        if not os.path.exists(self.state_path):
+            return None
+        with open(self.state_path, encoding="UTF-8") as f:
+            return json.load(f)
+
+    def _save(self, state):
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="UTF-8") as f:
+            json.dump(state, f, indent=4)
+        os.replace(tmp_path, self.state_path)
+
+    # 併發建立size個看板, 每個看板建立list_count個列表
+    def _provision(self):
+        async def work(operation):
+            boards = await operation.api.gather(operation.create_trello_board(self.name) for _ in range(self.size))
+            for res in boards:
+                res.raise_for_status()
+            lists = await operation.api.gather(
+                operation.create_trello_lists(res.json()["id"], [f"list {i + 1}" for i in range(self.list_count)])
+                for res in boards)
+            return [
+                {"id": board.json()["id"], "name": self.name, "lists": [item.json() for item in board_lists],
+                 "leased_by": None}
+                for board, board_lists in zip(boards, lists)
+            ]
+
+        return self._run(work)
+
+    # 第一個加入的worker負責建立看板, 其他worker直接沿用狀態檔.
+    # plugin在collection階段(xdist開始分派測試前)就呼叫, 所有worker都登記後才會有人finish
+    def start(self):
+        with self.lock:
+            state = self._load()
+            if state is None:
+                state = {"boards": self._provision(), "workers": []}
+            if self.worker_id not in state["workers"]:
+                state["workers"].append(self.worker_id)
+            self._save(state)
+        return state["boards"]
+
+    # 租借一個空閒的看板, 全部被借走時等待; 還原失敗的看板不再借出
+    def lease(self):
+        deadline = time.monotonic() + self.lease_timeout
+        while True:
+            with self.lock:
+                state = self._load()
+                usable = [board for board in state["boards"] if not board.get("broken")]
+                if not usable:
+                    raise RuntimeError("All boards in pool {} failed to reset".format(self.state_path))
+                for board in usable:
+                    if board["leased_by"] is None:
+                        board["leased_by"] = self.worker_id
+                        self._save(state)
+                        return board
+            if time.monotonic() > deadline:
+                raise TimeoutError("No free board in pool {} after {}s".format(self.state_path, self.lease_timeout))
+            time.sleep(0.1)
+
+    # 還原看板內容後歸還; 還原失敗時標記為broken, 其他worker不會再等它
+    def release(self, board):
+        keep = {item["id"] for item in board["lists"]}
+        broken = True
+        try:
+            self._run(lambda operation: operation.reset_trello_board(board["id"], board["name"], keep))
+            broken = False
+        finally:
+            with self.lock:
+                state = self._load()
+                for item in state["boards"]:
+                    if item["id"] == board["id"]:
+                        item["leased_by"] = None
+                        item["broken"] = broken
+                self._save(state)
+
+    # worker離開; 最後一個離開的worker併發刪除所有看板, 回傳刪除成功的看板id
+    def finish(self):
+        with self.lock:
+            state = self._load()
+            if state is None:
+                return []
+            if self.worker_id in state["workers"]:
+                state["workers"].remove(self.worker_id)
+            if state["workers"]:
+                self._save(state)
+                return []
+            board_ids = [board["id"] for board in state["boards"]]
+            responses = self._run(lambda operation: operation.delete_trello_boards(board_ids))
+            failed = [board for board, res in zip(state["boards"], responses) if not res.ok]
+            if failed:
+                # 刪除失敗的看板留在狀態檔, 不會無聲無息地留在帳號裡
+                state["boards"] = failed
+                self._save(state)
+                logger.error("Failed to delete boards %s, kept in %s", [board["id"] for board in failed],
+                             self.state_path)
+            else:
+                os.remove(self.state_path)
+        return [board_id for board_id, res in zip(board_ids, responses) if res.ok]
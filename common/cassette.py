@@ -0,0 +1,248 @@
+import base64
+import hashlib
+import json as complexjson
+import mmap
+import os
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from common.file_lock import FileLock
+from common.logger import logger
+from common.transport import TransportStats
+
+# 不寫進cassette的參數/header
+SECRET_PARAMS = frozenset(("key", "token"))
+SECRET_HEADERS = frozenset(("authorization", "cookie", "set-cookie"))
+
+MODES = ("off", "record", "replay", "auto")
+
+
+class CassetteMiss(LookupError):
+    pass
+
+
+def redact_url(url):
+    split = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(split.query, keep_blank_values=True) if k not in SECRET_PARAMS]
+    return urlunsplit((split.scheme, split.netloc, split.path, urlencode(query), split.fragment))
+
+
+def normalize_body(data=None, json=None):
+    if json is not None:
+        body = json
+    elif isinstance(data, dict):
+        body = {k: v for k, v in data.items() if k not in SECRET_PARAMS}
+    elif isinstance(data, bytes):
+        return data.decode("utf-8", "replace")
+    else:
+        return data or ""
+    return complexjson.dumps(body, sort_keys=True, ensure_ascii=False, default=str)
+
+
+# method + path + 排序後的params(去掉key/token) + body 的hash
+def request_key(method, url, params=None, data=None, json=None):
+    split = urlsplit(url)
+    query = parse_qsl(split.query, keep_blank_values=True)
+    if params:
+        query.extend((k, str(v)) for k, v in params.items() if v is not None)
+    query = sorted((k, v) for k, v in query if k not in SECRET_PARAMS)
+    raw = "{} {}?{}\n{}".format(method.upper(), split.path.rstrip("/"), urlencode(query),
+                                normalize_body(data, json))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+# 磁碟上的cassette: data檔(一行一筆json)+index檔(key offset length), 讀取用mmap.
+# 寫入只append, 同一個key重錄時index以最後一筆為準; xdist的worker透過檔案鎖輪流append
+class CassetteStore:
+    def __init__(self, path):
+        self.path = path
+        self.data_path = os.path.join(path, "data.jsonl")
+        self.index_path = os.path.join(path, "index.txt")
+        self.file_lock = FileLock(os.path.join(path, ".lock"))
+        self.written = 0
+        self._index = None
+        self._map = None
+        self._lock = threading.Lock()
+
+    @property
+    def index(self):
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._load_index()
+        return self._index
+
+    def _load_index(self):
+        index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="UTF-8") as f:
+                for line in f:
+                    key, offset, length = line.split()
+                    index[key] = (int(offset), int(length))
+        return index
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def get(self, key):
+        location = self.index.get(key)
+        if location is None:
+            return None
+        offset, length = location
+        with self._lock:
+            if self._map is None or offset + length > len(self._map):
+                if self._map is not None:
+                    self._map.close()
+                with open(self.data_path, "rb") as f:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            raw = self._map[offset:offset + length]
+        return complexjson.loads(raw)
+
+    def put(self, key, entry):
+        line = complexjson.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode("UTF-8") + b"\n"
+        index = self.index
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            # offset要在鎖內取得, 否則其他process同時append時index會指到別人的資料
+            with self.file_lock:
+                with open(self.data_path, "ab") as f:
+                    offset = f.seek(0, os.SEEK_END)
+                    f.write(line)
+                with open(self.index_path, "a", encoding="UTF-8") as f:
+                    f.write("{} {} {}\n".format(key, offset, len(line)))
+            index[key] = (offset, len(line))
+            self.written += 1
+
+    # 重錄留下的舊紀錄只會越積越多, 只保留index指到的最後一筆重寫data/index; 回傳移除的筆數.
+    # 重寫後舊的offset失效, 只能在所有process都不再讀寫這個cassette時呼叫(session結束時)
+    def compact(self):
+        with self._lock:
+            if not os.path.exists(self.index_path):
+                return 0
+            with self.file_lock:
+                with open(self.index_path, encoding="UTF-8") as f:
+                    total = sum(1 for _ in f)
+                index = self._load_index()
+                dropped = total - len(index)
+                if not dropped:
+                    return 0
+                if self._map is not None:
+                    self._map.close()
+                    self._map = None
+                with open(self.data_path, "rb") as f:
+                    data = f.read()
+                offset = 0
+                with open(self.data_path + ".tmp", "wb") as data_file, \
+                        open(self.index_path + ".tmp", "w", encoding="UTF-8") as index_file:
+                    for key, (start, length) in sorted(index.items(), key=lambda item: item[1][0]):
+                        data_file.write(data[start:start + length])
+                        index_file.write("{} {} {}\n".format(key, offset, length))
+                        index[key] = (offset, length)
+                        offset += length
+                os.replace(self.data_path + ".tmp", self.data_path)
+                os.replace(self.index_path + ".tmp", self.index_path)
+            self._index = index
+        return dropped
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+
+
+def dump_response(res):
+    try:
+        body, encoding = res.content.decode("utf-8"), "utf-8"
+    except UnicodeDecodeError:
+        body, encoding = base64.b64encode(res.content).decode("ascii"), "base64"
+    return {
+        "status": res.status_code,
+        "reason": res.reason,
+        "headers": {k: v for k, v in res.headers.items() if k.lower() not in SECRET_HEADERS},
+        "body": body,
+        "encoding": encoding,
+    }
+
+
+def load_response(recorded, prepared):
+    res = requests.Response()
+    res.status_code = recorded["status"]
+    res.reason = recorded.get("reason")
+    res.headers = CaseInsensitiveDict(recorded["headers"])
+    if recorded.get("encoding") == "base64":
+        res._content = base64.b64decode(recorded["body"])
+    else:
+        res._content = recorded["body"].encode("utf-8")
+    res.encoding = requests.utils.get_encoding_from_headers(res.headers) or "utf-8"
+    res.url = prepared.url
+    res.request = prepared
+    return res
+
+
+# 一個測試(scope)使用中的cassette, 同一個請求第n次出現對應第n筆紀錄
+class CassettePlayer:
+    def __init__(self, store, mode="auto", scope=""):
+        if mode not in MODES:
+            raise ValueError(f"Unsupported cassette mode: {mode}")
+        self.store = store
+        self.mode = mode
+        self.scope = scope
+        self.hits = 0
+        self.recorded = 0
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def _ordinal_key(self, base):
+        with self._lock:
+            ordinal = self._seen.get(base, 0)
+            self._seen[base] = ordinal + 1
+        return "{}-{}".format(base, ordinal)
+
+    def send(self, transport, session, method, url, **kwargs):
+        base = request_key(method, url, kwargs.get("params"), kwargs.get("data"), kwargs.get("json"))
+        base = hashlib.sha1("{}\n{}".format(self.scope, base).encode("utf-8")).hexdigest()
+        key = self._ordinal_key(base)
+        if self.mode in ("replay", "auto"):
+            entry = self.store.get(key)
+            if entry is None and self.mode == "replay":
+                # 重複的請求比錄製時多, 沿用第一筆
+                entry = self.store.get(base + "-0")
+            if entry is not None:
+                self.hits += 1
+                prepared = session.prepare_request(requests.Request(
+                    method, url, params=kwargs.get("params"), data=kwargs.get("data"), json=kwargs.get("json"),
+                    headers=kwargs.get("headers"), cookies=kwargs.get("cookies")))
+                return load_response(entry["response"], prepared), TransportStats()
+            if self.mode == "replay":
+                raise CassetteMiss(f"No recorded response for {method} {redact_url(url)} in {self.store.path}")
+        res, stats = transport.send(session, method, url, **kwargs)
+        params = {k: v for k, v in (kwargs.get("params") or {}).items() if k not in SECRET_PARAMS}
+        self.store.put(key, {
+            "request": {"method": method, "url": redact_url(url), "params": params,
+                        "body": normalize_body(kwargs.get("data"), kwargs.get("json"))},
+            "response": dump_response(res),
+        })
+        self.recorded += 1
+        logger.info("cassette recorded ==>> %s %s", method, redact_url(url))
+        return res, stats
+
+
+_active_player = [None]
+
+
+def active_player():
+    return _active_player[0]
+
+
+# 啟用cassette(所有執行緒共用), 回傳之前的player以便還原
+def use_player(player):
+    previous = _active_player[0]
+    _active_player[0] = player
+    return previous
@@ -1,35 +1,285 @@
+import atexit
+import json
 import logging
 import os
+import queue
+import threading
 import time
+from logging.handlers import QueueHandler
+
+
+# 延遲序列化, logger真的輸出時才json.dumps; text為已序列化的json字串(例如response.text), 輸出時才解析
+class LazyJson:
+    __slots__ = ("_obj", "text")
+
+    def __init__(self, obj=None, text=None):
+        self._obj = obj
+        self.text = text
+
+    @classmethod
+    def from_text(cls, text):
+        return cls(text=text)
+
+    @property
+    def obj(self):
+        if self._obj is None and self.text is not None:
+            try:
+                self._obj = json.loads(self.text)
+            except ValueError:
+                self._obj = self.text
+        return self._obj
+
+    def __str__(self):
+        obj = self.obj
+        if obj is self.text:
+            return obj
+        return json.dumps(obj, indent=4, ensure_ascii=False)
+
+    # 入queue時呼叫: 字串本身不可變, 直接沿用; dict/list(request的params/headers等小物件)淺複製
+    def snapshot(self):
+        if self.text is not None:
+            return self
+        if isinstance(self._obj, dict):
+            return LazyJson(dict(self._obj))
+        if isinstance(self._obj, list):
+            return LazyJson(list(self._obj))
+        return self
+
+
+# 單行json格式(JSON lines), LazyJson參數直接放進data欄位不縮排
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        args = record.args if isinstance(record.args, tuple) else ()
+        data = [arg.obj for arg in args if isinstance(arg, LazyJson)]
+        if data:
+            message = record.msg % tuple("" if isinstance(arg, LazyJson) else arg for arg in args)
+        else:
+            message = record.getMessage()
+        entry = {
+            "time": self.formatTime(record),
+            "file": record.filename,
+            "line": record.lineno,
+            "level": record.levelname,
+            "msg": message,
+        }
+        if data:
+            entry["msg"] = message.rstrip(" =>")
+            entry["data"] = data[0] if len(data) == 1 else data
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+# 不在呼叫端格式化, 交給背景writer處理;
+# LazyJson參數在入queue時先淺複製, 避免writer格式化前呼叫端改了物件(或在另一個thread改到一半)
+class FastQueueHandler(QueueHandler):
+    def prepare(self, record):
+        if isinstance(record.args, tuple) and any(isinstance(arg, LazyJson) for arg in record.args):
+            record.args = tuple(arg.snapshot() if isinstance(arg, LazyJson) else arg for arg in record.args)
+        return record
+
+
+# 批次寫檔並依大小/時間輪替
+class BatchFileHandler(logging.Handler):
+    def __init__(self, filename, max_bytes=0, rotate_seconds=0, backup_count=5, encoding="UTF-8"):
+        super().__init__()
+        self.filename = os.path.abspath(filename)
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backup_count = backup_count
+        self.encoding = encoding
+        self.stream = None
+        self._open()
+
+    def _open(self):
+        self.stream = open(self.filename, "a", encoding=self.encoding)
+        self.size = self.stream.tell()
+        self.opened_at = time.time()
+
+    def should_rollover(self, incoming):
+        if self.max_bytes and self.size and self.size + incoming > self.max_bytes:
+            return True
+        return bool(self.rotate_seconds) and time.time() - self.opened_at >= self.rotate_seconds
+
+    def do_rollover(self):
+        self.stream.close()
+        target = "{}.{}".format(self.filename, time.strftime("%Y%m%d%H%M%S"))
+        index = 1
+        while os.path.exists(target):
+            target = "{}.{}.{}".format(self.filename, time.strftime("%Y%m%d%H%M%S"), index)
+            index += 1
+        os.replace(self.filename, target)
+        if self.backup_count:
+            prefix = os.path.basename(self.filename) + "."
+            folder = os.path.dirname(self.filename)
+            backups = sorted(
+                (os.path.join(folder, name) for name in os.listdir(folder) if name.startswith(prefix)),
+                key=os.path.getmtime,
+            )
+            for old in backups[:-self.backup_count]:
+                os.remove(old)
+        self._open()
+
+    def emit_batch(self, records):
+        lines = []
+        for record in records:
+            if record.levelno < self.level:
+                continue
+            try:
+                lines.append(self.format(record))
+            except Exception:
+                self.handleError(record)
+        if not lines:
+            return
+        text = "\n".join(lines) + "\n"
+        # size以byte計算(和tell()一致), 中文一個字不只1 byte
+        incoming = len(text.encode(self.encoding))
+        with self.lock:
+            if self.should_rollover(incoming):
+                self.do_rollover()
+            self.stream.write(text)
+            self.stream.flush()
+            self.size += incoming
+
+    def emit(self, record):
+        self.emit_batch([record])
+
+    def close(self):
+        with self.lock:
+            if self.stream:
+                self.stream.close()
+                self.stream = None
+        super().close()
+
+
+# 背景writer: 從queue一次取出多筆, 批次交給handler
+class BatchWriter:
+    _sentinel = None
+
+    def __init__(self, log_queue, handlers, batch_size=512):
+        self.queue = log_queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="SystemLogWriter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self.queue.put(self._sentinel)
+        self._thread.join()
+        self._thread = None
+        for handler in self.handlers:
+            handler.close()
+
+    def _write(self, batch):
+        for handler in self.handlers:
+            if hasattr(handler, "emit_batch"):
+                handler.emit_batch(batch)
+            else:
+                for record in batch:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = self._sentinel in batch
+            self._write([record for record in batch if record is not self._sentinel])
+            if stop:
+                return
 
 
 # 記錄日誌
 class Logger:
-    def __init__(self, logger_name, log_path):
+    # logger_name -> 目前使用中的BatchWriter
+    _writers = {}
+
+    def __init__(self, logger_name, log_path, mode="sync", fmt="text", max_bytes=0, rotate_seconds=0,
+                 backup_count=5):
         if not os.path.exists(log_path):
             os.makedirs(log_path)
-        self.logname = os.path.join(
-            log_path, "{}.log".format(logger_name + "_" + time.strftime("%Y%m%d%H%M"))
-        )
         self.logger = logging.getLogger(logger_name)
         self.logger.setLevel(logging.INFO)
+        # 重複建立同名Logger時先拿掉舊的handler, 避免每行寫兩次
+        self._reset_handlers(logger_name)
 
-        self.formater = logging.Formatter(
-            "[%(asctime)s][%(filename)s %(lineno)d][%(levelname)s]: %(message)s"
-        )
+        if fmt == "jsonl":
+            self.formater = JsonLinesFormatter()
+        else:
+            self.formater = logging.Formatter(
+                "[%(asctime)s][%(filename)s %(lineno)d][%(levelname)s]: %(message)s"
+            )
 
-        self.filelogger = logging.FileHandler(self.logname, mode="a", encoding="UTF-8")
+        if mode == "queue":
+            # pytest-xdist的每個worker各自輪替, 不能共用同一個檔案
+            worker = os.getenv("PYTEST_XDIST_WORKER")
+            filename = "{}_{}.log".format(logger_name, worker) if worker else "{}.log".format(logger_name)
+            self.logname = os.path.join(log_path, filename)
+            self.filelogger = BatchFileHandler(self.logname, max_bytes=max_bytes, rotate_seconds=rotate_seconds,
+                                               backup_count=backup_count)
+        else:
+            self.logname = os.path.join(
+                log_path, "{}.log".format(logger_name + "_" + time.strftime("%Y%m%d%H%M"))
+            )
+            self.filelogger = logging.FileHandler(self.logname, mode="a", encoding="UTF-8")
         self.console = logging.StreamHandler()
         self.console.setLevel(logging.DEBUG)
         self.filelogger.setLevel(logging.DEBUG)
         self.filelogger.setFormatter(self.formater)
         self.console.setFormatter(self.formater)
-        self.logger.addHandler(self.filelogger)
+        handlers = [self.filelogger]
         if logger_name in ("SystemLog"):
-            self.logger.addHandler(self.console)
+            handlers.append(self.console)
+
+        if mode == "queue":
+            writer = BatchWriter(queue.SimpleQueue(), handlers)
+            writer.start()
+            Logger._writers[logger_name] = writer
+            self._add_handler(FastQueueHandler(writer.queue))
+        else:
+            for handler in handlers:
+                self._add_handler(handler)
+
+    def _add_handler(self, handler):
+        handler.system_log_owned = True
+        self.logger.addHandler(handler)
+
+    def _reset_handlers(self, logger_name):
+        writer = Logger._writers.pop(logger_name, None)
+        for handler in list(self.logger.handlers):
+            if getattr(handler, "system_log_owned", False):
+                self.logger.removeHandler(handler)
+                if writer is None:
+                    handler.close()
+        if writer is not None:
+            writer.stop()
+
+    # 把queue裡的紀錄全部寫完(程式結束時呼叫)
+    @classmethod
+    def shutdown(cls):
+        for name in list(cls._writers):
+            cls._writers.pop(name).stop()
+
 
+atexit.register(Logger.shutdown)
 
 # 指定本地根目錄
 BasePath = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 log_directory = os.path.join(BasePath, "Log")
-logger = Logger(logger_name="SystemLog", log_path=log_directory).logger
+logger = Logger(
+    logger_name="SystemLog",
+    log_path=log_directory,
+    mode=os.getenv("LOG_MODE", "sync"),
+    fmt=os.getenv("LOG_FORMAT", "text"),
+    max_bytes=int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024)),
+    rotate_seconds=int(os.getenv("LOG_ROTATE_SECONDS", 24 * 60 * 60)),
+).logger
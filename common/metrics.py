@@ -0,0 +1,179 @@
+import bisect
+import re
+import threading
+from urllib.parse import urlsplit
+
+# Trello的資源名稱, 後面接的segment視為id
+COLLECTIONS = frozenset((
+    "actions", "batch", "boards", "cards", "checklists", "checkItem", "checkItems", "customField", "customFields",
+    "customFieldItems", "emoji", "enterprises", "labels", "lists", "members", "notifications", "organizations",
+    "plugins", "search", "tokens", "webhooks",
+))
+ID_PATTERN = re.compile(r"^(?:[0-9a-fA-F]{24}|\d+)$")
+
+# 直方圖的區間上限(毫秒)
+HISTOGRAM_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+# 把實際url轉成endpoint樣板, 例如 /1/boards/5f0c.../lists -> /boards/{id}/lists
+def endpoint_template(url, root_path=""):
+    path = urlsplit(url).path
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    template = []
+    previous = None
+    for segment in (p for p in path.split("/") if p):
+        if ID_PATTERN.match(segment) or (previous in COLLECTIONS and segment not in COLLECTIONS):
+            segment = "{id}"
+        template.append(segment)
+        previous = segment
+    return "/" + "/".join(template)
+
+
+# 單次請求的量測結果
+class RequestSample:
+    __slots__ = ("method", "endpoint", "status_code", "total", "ttfb", "request_bytes", "response_bytes",
+                 "retries", "throttle_wait", "nodeid")
+
+    def __init__(self, method, endpoint, status_code, total, ttfb, request_bytes, response_bytes, retries=0,
+                 throttle_wait=0.0, nodeid=None):
+        self.method = method
+        self.endpoint = endpoint
+        self.status_code = status_code
+        self.total = total
+        self.ttfb = ttfb
+        self.request_bytes = request_bytes
+        self.response_bytes = response_bytes
+        self.retries = retries
+        self.throttle_wait = throttle_wait
+        self.nodeid = nodeid
+
+
+_listeners = []
+# 目前執行中的測試node id, 由pytest plugin設定
+current_nodeid = [None]
+
+
+def add_listener(listener):
+    _listeners.append(listener)
+
+
+def remove_listener(listener):
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def enabled():
+    return bool(_listeners)
+
+
+def emit(sample):
+    if sample.nodeid is None:
+        sample.nodeid = current_nodeid[0]
+    for listener in list(_listeners):
+        listener(sample)
+
+
+# nearest-rank百分位數, values需已排序
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    rank = max(1, -(-len(values) * pct // 100))
+    return values[int(rank) - 1]
+
+
+def histogram(values_ms):
+    counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+    for value in values_ms:
+        counts[bisect.bisect_left(HISTOGRAM_BUCKETS_MS, value)] += 1
+    labels = ["<={}".format(b) for b in HISTOGRAM_BUCKETS_MS] + [">{}".format(HISTOGRAM_BUCKETS_MS[-1])]
+    return dict(zip(labels, counts))
+
+
+# 彙總樣本: 依endpoint與測試分組, 可合併其他worker的原始資料
+class MetricsCollector:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+        self.tests = {}
+
+    def __call__(self, sample):
+        self.add(sample)
+
+    def add(self, sample):
+        key = "{} {}".format(sample.method, sample.endpoint)
+        with self._lock:
+            entry = self.endpoints.setdefault(key, {
+                "total_ms": [], "ttfb_ms": [], "errors": 0, "retries": 0, "throttle_wait_ms": 0.0,
+                "request_bytes": 0, "response_bytes": 0,
+            })
+            entry["total_ms"].append(sample.total * 1000)
+            entry["ttfb_ms"].append(sample.ttfb * 1000)
+            entry["errors"] += sample.status_code >= 400
+            entry["retries"] += sample.retries
+            entry["throttle_wait_ms"] += sample.throttle_wait * 1000
+            entry["request_bytes"] += sample.request_bytes
+            entry["response_bytes"] += sample.response_bytes
+            test = self.tests.setdefault(sample.nodeid or "<no test>", {"requests": 0, "total_ms": 0.0})
+            test["requests"] += 1
+            test["total_ms"] += sample.total * 1000
+
+    # 給xdist worker回傳用的原始資料
+    def raw(self):
+        with self._lock:
+            return {"endpoints": self.endpoints, "tests": self.tests}
+
+    def merge(self, raw):
+        with self._lock:
+            for key, other in raw["endpoints"].items():
+                entry = self.endpoints.setdefault(key, {k: [] if isinstance(v, list) else 0 for k, v in other.items()})
+                for name, value in other.items():
+                    entry[name] = entry[name] + value
+            for nodeid, other in raw["tests"].items():
+                test = self.tests.setdefault(nodeid, {"requests": 0, "total_ms": 0.0})
+                test["requests"] += other["requests"]
+                test["total_ms"] += other["total_ms"]
+
+    def report(self):
+        endpoints = {}
+        with self._lock:
+            for key, entry in self.endpoints.items():
+                totals = sorted(entry["total_ms"])
+                ttfbs = sorted(entry["ttfb_ms"])
+                endpoints[key] = {
+                    "count": len(totals),
+                    "errors": entry["errors"],
+                    "retries": entry["retries"],
+                    "throttle_wait_ms": round(entry["throttle_wait_ms"], 3),
+                    "request_bytes": entry["request_bytes"],
+                    "response_bytes": entry["response_bytes"],
+                    "total_ms": {"sum": round(sum(totals), 3), "p50": round(percentile(totals, 50), 3),
+                                 "p95": round(percentile(totals, 95), 3), "p99": round(percentile(totals, 99), 3),
+                                 "max": round(totals[-1], 3) if totals else 0.0},
+                    "ttfb_ms": {"p50": round(percentile(ttfbs, 50), 3), "p95": round(percentile(ttfbs, 95), 3),
+                                "p99": round(percentile(ttfbs, 99), 3)},
+                    "histogram_ms": histogram(totals),
+                }
+            tests = {nodeid: {"requests": test["requests"], "total_ms": round(test["total_ms"], 3)}
+                     for nodeid, test in self.tests.items()}
+        return {"endpoints": endpoints, "tests": tests}
+
+
+# 終端機用的摘要表, 依總耗時排序
+def format_report(report, limit=20):
+    rows = sorted(report["endpoints"].items(), key=lambda item: item[1]["total_ms"]["sum"], reverse=True)
+    width = max([len("endpoint")] + [len(key) for key, _ in rows[:limit]])
+    lines = ["{:<{w}} {:>6} {:>6} {:>9} {:>9} {:>9} {:>10} {:>7}".format(
+        "endpoint", "count", "errors", "p50 ms", "p95 ms", "p99 ms", "total ms", "retries", w=width)]
+    for key, entry in rows[:limit]:
+        total = entry["total_ms"]
+        lines.append("{:<{w}} {:>6} {:>6} {:>9.1f} {:>9.1f} {:>9.1f} {:>10.1f} {:>7}".format(
+            key, entry["count"], entry["errors"], total["p50"], total["p95"], total["p99"], total["sum"],
+            entry["retries"], w=width))
+    slowest = sorted(report["tests"].items(), key=lambda item: item[1]["total_ms"], reverse=True)[:5]
+    if slowest:
+        lines.append("")
+        lines.append("slowest tests by api time:")
+        for nodeid, test in slowest:
+            lines.append("  {:>10.1f} ms {:>5} req  {}".format(test["total_ms"], test["requests"], nodeid))
+    return "\n".join(lines)
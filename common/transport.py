@@ -0,0 +1,174 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from common.logger import logger
+from config.config import settings
+
+# 重試時不會造成重複副作用的method
+IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE"))
+RETRY_STATUS = frozenset((500, 502, 503, 504))
+
+
+# token bucket: 每秒補rate個token, 最多capacity個
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    # 預約一個token, 回傳需要等待的秒數(0表示可以直接送出)
+    def reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+# 依Trello規則限制: 每個key 300次/10秒, 每個token 100次/10秒
+class RateLimiter:
+    def __init__(self, key_limit=300, token_limit=100, window=10.0):
+        self.key_limit = key_limit
+        self.token_limit = token_limit
+        self.window = window
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, kind, value, limit):
+        with self._lock:
+            bucket = self._buckets.get((kind, value))
+            if bucket is None:
+                bucket = self._buckets[(kind, value)] = TokenBucket(limit / self.window, limit)
+            return bucket
+
+    def reserve(self, key=None, token=None):
+        wait = 0.0
+        if key and self.key_limit:
+            wait = max(wait, self._bucket("key", key, self.key_limit).reserve())
+        if token and self.token_limit:
+            wait = max(wait, self._bucket("token", token, self.token_limit).reserve())
+        return wait
+
+
+# 單次請求的重試與等待統計
+class TransportStats:
+    __slots__ = ("attempts", "retries", "throttle_wait", "backoff_wait")
+
+    def __init__(self):
+        self.attempts = 0
+        self.retries = 0
+        self.throttle_wait = 0.0
+        self.backoff_wait = 0.0
+
+    def __repr__(self):
+        return "<TransportStats retries={} throttle_wait={:.3f}s backoff_wait={:.3f}s>".format(
+            self.retries, self.throttle_wait, self.backoff_wait)
+
+
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# 連線池/timeout/限流/重試設定, 負責實際送出請求
+class Transport:
+    def __init__(self, pool_size=10, connect_timeout=5.0, read_timeout=35.0, max_retries=3, backoff_factor=0.5,
+                 backoff_max=30.0, retry_after_max=60.0, rate_limiter=None, sleep=time.sleep):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self.rate_limiter = rate_limiter
+        self.sleep = sleep
+
+    @classmethod
+    def from_settings(cls, **overrides):
+        options = {
+            "pool_size": settings.get_int("transport", "pool_size", fallback=10),
+            "connect_timeout": settings.get_float("transport", "connect_timeout", fallback=5.0),
+            "read_timeout": settings.get_float("transport", "read_timeout", fallback=35.0),
+            "max_retries": settings.get_int("transport", "max_retries", fallback=3),
+            "backoff_factor": settings.get_float("transport", "backoff_factor", fallback=0.5),
+            "backoff_max": settings.get_float("transport", "backoff_max", fallback=30.0),
+            "retry_after_max": settings.get_float("transport", "retry_after_max", fallback=60.0),
+            "rate_limiter": default_rate_limiter if settings.get_bool(
+                "transport", "rate_limit", fallback=True) else None,
+        }
+        options.update(overrides)
+        return cls(**options)
+
+    def mount(self, session):
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+    def backoff(self, retry):
+        delay = min(self.backoff_max, self.backoff_factor * (2 ** retry))
+        return delay * random.uniform(0.9, 1.0)
+
+    def send(self, session, method, url, **kwargs):
+        kwargs.setdefault("timeout", (self.connect_timeout, self.read_timeout))
+        params = kwargs.get("params") or {}
+        stats = TransportStats()
+        while True:
+            if self.rate_limiter is not None:
+                wait = self.rate_limiter.reserve(params.get("key"), params.get("token"))
+                if wait:
+                    stats.throttle_wait += wait
+                    self.sleep(wait)
+            stats.attempts += 1
+            can_retry = stats.retries < self.max_retries
+            try:
+                res = session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if not (can_retry and method in IDEMPOTENT_METHODS):
+                    raise
+                delay = self.backoff(stats.retries)
+                logger.warning("%s %s failed (%s), retry in %.2fs", method, url, e, delay)
+                stats.backoff_wait += delay
+            else:
+                if res.status_code == 429 and can_retry:
+                    delay = parse_retry_after(res.headers.get("Retry-After"))
+                    if delay is None:
+                        delay = self.backoff(stats.retries)
+                    delay = min(delay, self.retry_after_max)
+                    logger.warning("%s %s rate limited (429), retry in %.2fs", method, url, delay)
+                    stats.throttle_wait += delay
+                elif res.status_code in RETRY_STATUS and can_retry and method in IDEMPOTENT_METHODS:
+                    delay = self.backoff(stats.retries)
+                    logger.warning("%s %s returned %s, retry in %.2fs", method, url, res.status_code, delay)
+                    stats.backoff_wait += delay
+                else:
+                    return res, stats
+                res.close()
+            stats.retries += 1
+            self.sleep(delay)
+
+
+# 同一個process內所有client共用, 才能對應Trello對key/token的總量限制
+default_rate_limiter = RateLimiter(
+    key_limit=settings.get_int("transport", "key_rate_limit", fallback=300),
+    token_limit=settings.get_int("transport", "token_rate_limit", fallback=100),
+    window=settings.get_float("transport", "rate_window", fallback=10.0),
+)
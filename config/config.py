@@ -1,16 +1,102 @@
 import os
-from configparser import ConfigParser
+import threading
+import time
+from configparser import ConfigParser, NoOptionError, NoSectionError
+
+_MISSING = object()
+
+
+# 設定檔只解析一次, 檔案mtime變動才重新讀取
+# 取值順序: 環境變數(SECTION_KEY) > [section:env] > [section] > fallback
+class Settings:
+    def __init__(self, path, env=None, check_interval=1.0):
+        self.path = path
+        self.env = env if env is not None else os.getenv("TRELLO_ENV", "")
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._sections = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self.parse_count = 0
+
+    @staticmethod
+    def _stat_mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load(self):
+        config = ConfigParser()
+        config.read(self.path, encoding="UTF-8")
+        self.parse_count += 1
+        return {section: dict(config.items(section, raw=True)) for section in config.sections()}
+
+    # 取得目前的設定內容, 超過check_interval才檢查一次mtime
+    def sections(self):
+        now = time.monotonic()
+        # 讀進local再檢查/回傳, 避免其他thread在中間reload()把_sections設成None
+        sections = self._sections
+        if sections is not None and now - self._checked_at < self.check_interval:
+            return sections
+        with self._lock:
+            sections = self._sections
+            if sections is None or now - self._checked_at >= self.check_interval:
+                mtime = self._stat_mtime(self.path)
+                if sections is None or mtime != self._mtime:
+                    sections = self._sections = self._load()
+                    self._mtime = mtime
+                self._checked_at = now
+            return sections
+
+    def reload(self):
+        with self._lock:
+            self._sections = None
+            self._checked_at = 0.0
+
+    def get(self, section, key, fallback=_MISSING):
+        env_value = os.environ.get("{}_{}".format(section, key).upper())
+        if env_value is not None:
+            return env_value
+        sections = self.sections()
+        names = [section]
+        if self.env:
+            names.insert(0, "{}:{}".format(section, self.env))
+        for name in names:
+            values = sections.get(name)
+            if values is not None and key.lower() in values:
+                return values[key.lower()]
+        if fallback is not _MISSING:
+            return fallback
+        if not any(name in sections for name in names):
+            raise NoSectionError(section)
+        raise NoOptionError(key, section)
+
+    def get_int(self, section, key, fallback=_MISSING):
+        value = self.get(section, key, fallback)
+        return value if value is fallback else int(value)
+
+    def get_float(self, section, key, fallback=_MISSING):
+        value = self.get(section, key, fallback)
+        return value if value is fallback else float(value)
+
+    def get_bool(self, section, key, fallback=_MISSING):
+        value = self.get(section, key, fallback)
+        if value is fallback or isinstance(value, bool):
+            return value
+        if value.lower() not in ConfigParser.BOOLEAN_STATES:
+            raise ValueError("Not a boolean: {}".format(value))
+        return ConfigParser.BOOLEAN_STATES[value.lower()]
+
+
+# 取得根目錄中env檔案
+base_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+settings = Settings(os.path.join(base_path, "config", 'trello_env.ini'))
 
 
 # env.ini檔案取方式
 class ConfigPath:
     @staticmethod
     def get_config(basic_key, need_value):
-        config = ConfigParser()
-        # 取得根目錄
-        base_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
-        # 取得根目錄中env檔案
-        account_setting_path = os.path.join(base_path, "config", 'trello_env.ini')
-        config.read(account_setting_path)
-        need_content = config.get(basic_key, need_value)
+        need_content = settings.get(basic_key, need_value)
         return need_content
@@ -0,0 +1,2 @@
+# 共用的pytest plugin(cassette錄製/回放等)
+pytest_plugins = ["api_trello_case.conftest"]
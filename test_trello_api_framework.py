@@ -1,44 +1,125 @@
 import os
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlencode, urlsplit
 
 import allure
+import allure_commons
 import pytest
-import json
 
 import requests
 import json as complexjson
 import curlify
 
 # 引入logger
-from common.logger import logger
+from common.logger import logger, LazyJson
+from common import metrics
+from common.cassette import active_player
+from common.transport import Transport
+from config.config import settings
 
 from typing import Optional
 
 # ----------------------------------------------------------------
 # env.ini
-trello_URL = "https://api.trello.com/1"
-trello_Board_name = "My_test_board"
+trello_URL = settings.get("trello", "url", fallback="https://api.trello.com/1")
+trello_Board_name = settings.get("trello", "board_name", fallback="My_test_board")
+trello_KEY = settings.get("trello", "key", fallback="")
+trello_Token = settings.get("trello", "token", fallback="")
 
 # ----------------------------------------------------------------
 
 
+# allure附件模式: auto(有allure listener才附加) / always / off
+ALLURE_ATTACH_MODE = os.getenv("ALLURE_ATTACH_MODE", "auto")
+
+_UNSET = object()
+
+
+# 判斷這次是否需要產生allure附件
+def allure_attach_enabled():
+    if ALLURE_ATTACH_MODE == "off":
+        return False
+    if ALLURE_ATTACH_MODE == "always":
+        return True
+    return bool(allure_commons.plugin_manager.hook.attach_data.get_hookimpls())
+
+
+# 包裝requests.Response, json只解析一次
+class ApiResponse:
+    def __init__(self, response, stats=None):
+        self.response = response
+        self.stats = stats
+        self._json = _UNSET
+        self._json_error = None
+
+    # 這次請求重試了幾次
+    @property
+    def retries(self):
+        return self.stats.retries if self.stats else 0
+
+    # 因限流(token bucket/429 Retry-After)等待的秒數
+    @property
+    def throttle_wait(self):
+        return self.stats.throttle_wait if self.stats else 0.0
+
+    def json(self, **kwargs):
+        if kwargs:
+            return self.response.json(**kwargs)
+        if self._json_error is not None:
+            raise self._json_error
+        if self._json is _UNSET:
+            try:
+                self._json = self.response.json()
+            except requests.exceptions.JSONDecodeError as e:
+                self._json_error = e
+                raise
+        return self._json
+
+    def __getattr__(self, name):
+        return getattr(self.response, name)
+
+    def __bool__(self):
+        return bool(self.response)
+
+    def __repr__(self):
+        return f"<ApiResponse [{self.response.status_code}]>"
+
+
 # rest_client api交互邏輯
 def check_response_json(response):
+    # 解析錯誤是error log, 只有連error都關閉時才跳過
+    if not logger.isEnabledFor(logging.ERROR):
+        return
+    if "json" in response.headers.get("Content-Type", ""):
+        # 標明為json的回應直接記錄原始文字, 解析/縮排交給logger輸出時(queue模式在背景thread)處理
+        logger.info("api response json ==>> %s", LazyJson.from_text(response.text))
+        return
     try:
-        # 嘗試將響應內容解析為 JSON 格式
-        response.json()
-        # 如果成功，記錄 JSON 響應內容
-        logger.info("api response json ==>> {}".format(json.dumps(response.json(), indent=4, ensure_ascii=False)))
+        # 嘗試將響應內容解析為 JSON 格式(結果會快取在ApiResponse)
+        body = response.json()
     except requests.exceptions.JSONDecodeError:
         # 如果解析失敗，記錄錯誤信息
-        logger.error('Json decode error, json text is==>> {}'.format(response.text))
+        logger.error('Json decode error, json text is==>> %s', response.text)
+        return
+    # 如果成功，記錄 JSON 響應內容(結果會快取, case之後呼叫json()不會再解析)
+    logger.info("api response json ==>> %s", LazyJson(body))
 
 
 # ----------------------------------------------------------------
 # 自定義api方法
 class RestClient:
-    def __init__(self, api_root_url):
+    def __init__(self, api_root_url, transport=None):
         self.api_root_url = api_root_url
         self.session = requests.session()
+        # 連線池/timeout/限流/重試設定, 預設讀取trello_env.ini的[transport]
+        self.transport = transport or Transport.from_settings()
+        self.transport.mount(self.session)
 
     def get(self, url, headers: Optional = {}, **kwargs):
         return self.request(url, "GET", headers, **kwargs)
@@ -56,63 +137,99 @@ class RestClient:
         return self.request(url, "PATCH", headers, data, **kwargs)
 
     def request(self, url, method, headers, data=None, json=None, **kwargs):
-        time_out_sec = 35
         url = self.api_root_url + url
         headers = headers
         params = dict(**kwargs).get("params")
         cookies = dict(**kwargs).get("cookies")
 
         if method == "GET":
-            res = self.session.get(url, headers=headers, timeout=time_out_sec, **kwargs)
+            send_kwargs = dict(headers=headers)
         elif method == "POST":
-            res = self.session.post(url=url, data=data, json=json, headers=headers, timeout=time_out_sec, **kwargs)
+            send_kwargs = dict(data=data, json=json, headers=headers)
         elif method == "PUT":
             if json:
                 data = complexjson.dumps(json)
-            res = self.session.put(url, data, headers=headers, timeout=time_out_sec, **kwargs)
+            send_kwargs = dict(data=data, headers=headers)
         elif method == "DELETE":
-            res = self.session.delete(url, headers=headers, json=json, timeout=time_out_sec, **kwargs)
+            send_kwargs = dict(headers=headers, json=json)
         elif method == "PATCH":
             if json:
                 data = complexjson.dumps(json)
-            res = self.session.patch(url, data, headers=headers, timeout=time_out_sec, **kwargs)
+            send_kwargs = dict(data=data, headers=headers)
         else:
             raise ValueError(f"Unsupported method: {method}")
-        self.extract_curl_res(res)
-        self.request_log(url, method, data, json, params, headers, cookies, res)
+        start = time.perf_counter()
+        # 有啟用cassette時由cassette錄製/回放
+        player = active_player()
+        if player is not None:
+            res, stats = player.send(self.transport, self.session, method, url, **send_kwargs, **kwargs)
+        else:
+            res, stats = self.transport.send(self.session, method, url, **send_kwargs, **kwargs)
+        res = ApiResponse(res, stats)
+        if metrics.enabled():
+            self.record_metrics(method, url, res, time.perf_counter() - start)
+        attach = allure_attach_enabled()
+        if attach:
+            self.extract_curl_res(res)
+        self.request_log(url, method, data, json, params, headers, cookies, res, attach=attach)
         check_response_json(res)
         return res
 
-    # 紀錄logger
+    # 送出效能量測(總耗時/TTFB/payload大小/重試)給有註冊的listener
+    def record_metrics(self, method, url, res, total):
+        body = res.request.body if res.request is not None else None
+        metrics.emit(metrics.RequestSample(
+            method=method,
+            endpoint=metrics.endpoint_template(url, urlsplit(self.api_root_url).path),
+            status_code=res.status_code,
+            total=total,
+            ttfb=res.elapsed.total_seconds(),
+            request_bytes=len(body) if body else 0,
+            response_bytes=len(res.content),
+            retries=res.retries,
+            throttle_wait=res.throttle_wait,
+        ))
+
+    # 紀錄logger, 只有logger等級或allure需要時才序列化
     @staticmethod
-    def request_log(url, method, data=None, json=None, params=None, headers=None, cookies=None, res=None):
+    def request_log(url, method, data=None, json=None, params=None, headers=None, cookies=None, res=None,
+                    attach=None):
+        if attach is None:
+            attach = allure_attach_enabled()
         status_code = res.status_code
-        logger.info("api url ==>> {}".format(url))
-        logger.info("api method==>> {}".format(method))
-        logger.info("status code ==>> {}".format(status_code))
-        logger.info("api request header ==>> {}".format(complexjson.dumps(headers, indent=4, ensure_ascii=False)))
+        logger.info("api url ==>> %s", url)
+        logger.info("api method==>> %s", method)
+        logger.info("status code ==>> %s", status_code)
+        if res.stats is not None and (res.stats.retries or res.stats.throttle_wait):
+            logger.info("retries ==>> %s, throttle wait ==>> %.3fs, backoff wait ==>> %.3fs",
+                        res.stats.retries, res.stats.throttle_wait, res.stats.backoff_wait)
+        logger.info("api request header ==>> %s", LazyJson(headers))
+        if params:
+            logger.info("api request params ==>> %s", LazyJson(params))
+        if data:
+            logger.info("api request data ==>> %s", LazyJson(data))
+        if json:
+            logger.info("api request json ==>> %s", LazyJson(json))
+        if cookies:
+            logger.info("api request cookies ==>> %s", LazyJson(cookies))
+        if not attach:
+            return
         allure.attach(
-            f'{method} {url} \nStatus Code: {status_code} ',
+            f'{method} {url} \nStatus Code: {status_code} \nRetries: {res.retries} '
+            f'\nThrottle wait: {res.throttle_wait:.3f}s',
             'requests method/url/time/header'
         )
         if params:
-            logger.info("api request params ==>> {}".format(complexjson.dumps(params, indent=4, ensure_ascii=False)))
-            allure.attach(f'{complexjson.dumps(params, indent=4, ensure_ascii=False)}', 'requests params')
+            allure.attach(str(LazyJson(params)), 'requests params')
         if data:
-            logger.info("api request data ==>> {}".format(complexjson.dumps(data, indent=4, ensure_ascii=False)))
-            allure.attach(f'{complexjson.dumps(data, indent=4, ensure_ascii=False)}'.replace('\'', '\"'),
-                          'requests data')
+            allure.attach(str(LazyJson(data)).replace('\'', '\"'), 'requests data')
         if json:
-            logger.info("api request json ==>> {}".format(complexjson.dumps(json, indent=4, ensure_ascii=False)))
-            allure.attach(f'{complexjson.dumps(json, indent=4, ensure_ascii=False)}'.replace('\'', '\"'),
-                          'requests json')
+            allure.attach(str(LazyJson(json)).replace('\'', '\"'), 'requests json')
         if cookies:
-            logger.info("api request cookies ==>> {}".format(complexjson.dumps(cookies, indent=4, ensure_ascii=False)))
-            allure.attach(f'{complexjson.dumps(cookies, indent=4, ensure_ascii=False)}', 'requests cookies')
+            allure.attach(str(LazyJson(cookies)), 'requests cookies')
         if res.text:
             try:
-                allure.attach(
-                    complexjson.dumps(res.json(), indent=4, ensure_ascii=False), f'{url} Response body')
+                allure.attach(str(LazyJson(res.json())), f'{url} Response body')
             except requests.exceptions.JSONDecodeError:
                 allure.attach(res.text, f'{url} Response body')
 
@@ -125,19 +242,320 @@ class RestClient:
             allure.attach('None', 'requests curl error')
             logger.error(f"Curlify error: {e}")
 
+
+# ----------------------------------------------------------------
+# 非同步api方法: 在執行緒池裡跑同步client, 沿用同一套logger/allure流程
+class AsyncRestClient:
+    client_class = RestClient
+
+    def __init__(self, api_root_url, concurrency=10, transport=None):
+        # 連線池至少要跟同時請求數一樣大, 否則連線會被丟掉重開
+        if transport is None:
+            transport = Transport.from_settings()
+            transport.pool_size = max(transport.pool_size, concurrency)
+        self.client = self.client_class(api_root_url, transport)
+        self.concurrency = concurrency
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="AsyncRestClient")
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def get(self, url, headers: Optional = {}, **kwargs):
+        return await self.run(self.client.get, url, headers, **kwargs)
+
+    async def post(self, url, data=None, json=None, headers: Optional = {}, **kwargs):
+        return await self.run(self.client.post, url, data, json, headers, **kwargs)
+
+    async def put(self, url, data=None, headers: Optional = {}, **kwargs):
+        return await self.run(self.client.put, url, data, headers, **kwargs)
+
+    async def delete(self, url, headers: Optional = {}, **kwargs):
+        return await self.run(self.client.delete, url, headers, **kwargs)
+
+    async def patch(self, url, data=None, headers: Optional = {}, **kwargs):
+        return await self.run(self.client.patch, url, data, headers, **kwargs)
+
+    async def request(self, url, method, headers, data=None, json=None, **kwargs):
+        return await self.run(self.client.request, url, method, headers, data, json, **kwargs)
+
+    # 同時執行多個請求, limit限制同時進行的數量, 結果依輸入順序回傳
+    async def gather(self, coros, limit=None):
+        semaphore = asyncio.Semaphore(limit or self.concurrency)
+
+        async def bounded(coro):
+            async with semaphore:
+                return await coro
+
+        return await asyncio.gather(*(bounded(coro) for coro in coros))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.client.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
 # ----------------------------------------------------------------
 
 
+# 透過Trello /batch合併GET, 每次最多10個url
+BATCH_MAX_URLS = 10
+
+
+# /batch中單一url的回應, 第一次讀取時才觸發送出
+class BatchItemResponse:
+    def __init__(self, batcher, url, params):
+        self.batcher = batcher
+        self.url = url
+        self.params = params
+        self.created_at = time.monotonic()
+        self._done = threading.Event()
+        self._status_code = None
+        self._body = None
+        self._error = None
+
+    def resolve(self, status_code, body):
+        self._status_code = status_code
+        self._body = body
+        self._done.set()
+
+    def fail(self, error):
+        self._error = error
+        self._done.set()
+
+    def _result(self):
+        if not self._done.is_set():
+            self.batcher.wait(self)
+        if self._error is not None:
+            raise self._error
+        return self._status_code, self._body
+
+    @property
+    def status_code(self):
+        return self._result()[0]
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        body = self._result()[1]
+        return body if isinstance(body, str) else complexjson.dumps(body, ensure_ascii=False)
+
+    def json(self):
+        status_code, body = self._result()
+        if isinstance(body, str):
+            raise requests.exceptions.JSONDecodeError("Expecting value", body, 0)
+        return body
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error for batch url: {self.url}")
+
+    def __repr__(self):
+        state = self._status_code if self._done.is_set() else "pending"
+        return f"<BatchItemResponse {self.url} [{state}]>"
+
+
+# 收集scope/時間窗內的GET, 以/batch一次送出
+class GetBatcher:
+    def __init__(self, client, window=None, max_urls=BATCH_MAX_URLS):
+        self.client = client
+        self.window = window
+        self.max_urls = max_urls
+        self.pending = []
+        self.batch_calls = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None):
+        item = BatchItemResponse(self, url, dict(params or {}))
+        with self._lock:
+            self.pending.append(item)
+            full = len(self.pending) >= self.max_urls
+        if full:
+            self.flush()
+        return item
+
+    # 還沒送出的item被讀取: 有設定window就先等其他請求加入
+    def wait(self, item):
+        if self.window:
+            remaining = self.window - (time.monotonic() - item.created_at)
+            if remaining > 0 and item._done.wait(remaining):
+                return
+        self.flush()
+        item._done.wait()
+
+    def flush(self):
+        with self._lock:
+            pending, self.pending = self.pending, []
+        groups = {}
+        for item in pending:
+            auth = (item.params.get("key"), item.params.get("token"))
+            groups.setdefault(auth, []).append(item)
+        for (key, token), items in groups.items():
+            for start in range(0, len(items), self.max_urls):
+                self._send(items[start:start + self.max_urls], key, token)
+
+    def _send(self, items, key, token):
+        urls = []
+        for item in items:
+            query = {k: v for k, v in item.params.items() if k not in ("key", "token")}
+            # urlencode已把值中的逗號轉成%2C, 不會和分隔url的逗號混淆
+            urls.append(item.url if not query else "{}?{}".format(item.url, urlencode(query)))
+        params = {"urls": ",".join(urls)}
+        if key:
+            params["key"] = key
+        if token:
+            params["token"] = token
+        self.batch_calls += 1
+        try:
+            res = self.client.request("/batch", "GET", {}, params=params)
+            results = res.json() if res.status_code == 200 else None
+        except Exception as e:
+            for item in items:
+                item.fail(e)
+            return
+        if not isinstance(results, list) or len(results) != len(items):
+            # 200但筆數對不上時無法對應到各個請求, 當成上游錯誤(502), 不能讓每筆都看起來成功
+            status_code = res.status_code if res.status_code != 200 else 502
+            for item in items:
+                item.resolve(status_code, res.text)
+            return
+        for item, result in zip(items, results):
+            item.resolve(*parse_batch_result(result))
+
+
+# /batch每一筆的格式: 成功為{"200": body}, 失敗為{"statusCode": 404, "message": ...}
+def parse_batch_result(result):
+    if isinstance(result, dict):
+        if len(result) == 1:
+            status, body = next(iter(result.items()))
+            if status.isdigit():
+                return int(status), body
+        if "statusCode" in result:
+            return int(result["statusCode"]), result.get("message", result)
+    return 500, result
+
+
 # 放在api_objects裡面作為打api的方法,以及url
 class API(RestClient):
-    def __init__(self, api_root_url):
-        super().__init__(api_root_url)
+    def __init__(self, api_root_url, transport=None):
+        super().__init__(api_root_url, transport)
+        self._batcher = None
+
+    # 在with區塊中的GET會被合併成/batch請求, 離開區塊時送出剩下的
+    @contextmanager
+    def batch(self, window=None):
+        batcher = GetBatcher(self, window=window)
+        previous, self._batcher = self._batcher, batcher
+        try:
+            yield batcher
+        finally:
+            self._batcher = previous
+            batcher.flush()
+
+    def get(self, url, headers: Optional = {}, **kwargs):
+        if self._batcher is not None and not headers and set(kwargs) <= {"params"}:
+            return self._batcher.get(url, kwargs.get("params"))
+        return super().get(url, headers, **kwargs)
+
+    # get方法取得看板
+    def get_board(self, board_id, params):
+        res = self.get(f"/boards/{board_id}", params=params)
+        return res
+
+    # get方法取得列表
+    def get_list(self, list_id, params):
+        res = self.get(f"/lists/{list_id}", params=params)
+        return res
+
+    # get方法取得卡片
+    def get_card(self, card_id, params):
+        res = self.get(f"/cards/{card_id}", params=params)
+        return res
+
+    # get方法取得看板中(未封存)的列表
+    def get_board_lists(self, board_id, params):
+        res = self.get(f"/boards/{board_id}/lists", params=params)
+        return res
+
+    # get方法取得看板中(未封存)的卡片
+    def get_board_cards(self, board_id, params):
+        res = self.get(f"/boards/{board_id}/cards", params=params)
+        return res
 
     # post方法創建看板並且在api_root_url引入domain
     def create_board_post(self, params):
         res = self.post("/boards/", params=params)
         return res
 
+    # post方法在看板中創建列表
+    def create_list_post(self, params):
+        res = self.post("/lists", params=params)
+        return res
+
+    # post方法在列表中創建卡片
+    def create_card_post(self, params):
+        res = self.post("/cards", params=params)
+        return res
+
+    # put方法更新看板欄位(例如名稱)
+    def update_board_put(self, board_id, params):
+        res = self.put(f"/boards/{board_id}", params=params)
+        return res
+
+    # put方法封存列表(Trello不能刪除列表)
+    def close_list_put(self, list_id, params):
+        res = self.put(f"/lists/{list_id}/closed", params=dict(params, value="true"))
+        return res
+
+    # delete方法刪除看板
+    def delete_board_delete(self, board_id, params):
+        res = self.delete(f"/boards/{board_id}", params=params)
+        return res
+
+    # delete方法刪除卡片
+    def delete_card_delete(self, card_id, params):
+        res = self.delete(f"/cards/{card_id}", params=params)
+        return res
+
+
+# 非同步版本的API, 同樣的endpoint方法改為await
+class AsyncAPI(AsyncRestClient):
+    client_class = API
+
+    async def create_board_post(self, params):
+        return await self.run(self.client.create_board_post, params)
+
+    async def create_list_post(self, params):
+        return await self.run(self.client.create_list_post, params)
+
+    async def create_card_post(self, params):
+        return await self.run(self.client.create_card_post, params)
+
+    async def get_board_lists(self, board_id, params):
+        return await self.run(self.client.get_board_lists, board_id, params)
+
+    async def get_board_cards(self, board_id, params):
+        return await self.run(self.client.get_board_cards, board_id, params)
+
+    async def update_board_put(self, board_id, params):
+        return await self.run(self.client.update_board_put, board_id, params)
+
+    async def close_list_put(self, list_id, params):
+        return await self.run(self.client.close_list_put, list_id, params)
+
+    async def delete_board_delete(self, board_id, params):
+        return await self.run(self.client.delete_board_delete, board_id, params)
+
+    async def delete_card_delete(self, card_id, params):
+        return await self.run(self.client.delete_card_delete, card_id, params)
+
 
 # ----------------------------------------------------------------
 # 放在operation裡面作為api request的內容
@@ -155,6 +573,105 @@ class APIOperation:
         res = self.api.create_board_post(params)
         return res
 
+    # 在看板中創建列表
+    def create_trello_list(self, board_id, name):
+        params = {
+            "name": name,
+            "idBoard": board_id,
+            "key": trello_KEY,
+            "token": trello_Token
+        }
+        res = self.api.create_list_post(params)
+        return res
+
+    # 在列表中創建卡片
+    def create_trello_card(self, list_id, name):
+        params = {
+            "name": name,
+            "idList": list_id,
+            "key": trello_KEY,
+            "token": trello_Token
+        }
+        res = self.api.create_card_post(params)
+        return res
+
+    # 刪除看板
+    def delete_trello_board(self, board_id):
+        params = {
+            "key": trello_KEY,
+            "token": trello_Token
+        }
+        res = self.api.delete_board_delete(board_id, params)
+        return res
+
+    # 讀取多張卡片, 以/batch合併請求
+    def get_trello_cards(self, card_ids):
+        params = {
+            "key": trello_KEY,
+            "token": trello_Token
+        }
+        with self.api.batch():
+            responses = [self.api.get_card(card_id, params) for card_id in card_ids]
+        return responses
+
+
+# 非同步operation, 批次建立資源時以concurrency限制同時請求數
+class AsyncAPIOperation:
+    def __init__(self, config_url, concurrency=10):
+        self.api = AsyncAPI(config_url, concurrency)
+
+    async def create_trello_board(self, name=None):
+        params = {
+            "name": name or trello_Board_name,
+            "key": trello_KEY,
+            "token": trello_Token
+        }
+        return await self.api.create_board_post(params)
+
+    # 在同一個看板建立多個列表
+    async def create_trello_lists(self, board_id, names, limit=None):
+        return await self.api.gather(
+            (self.api.create_list_post({"name": name, "idBoard": board_id, "key": trello_KEY, "token": trello_Token})
+             for name in names),
+            limit,
+        )
+
+    # 建立count張卡片, 依序平均分配到list_ids
+    async def create_trello_cards(self, list_ids, count, name_prefix="card", limit=None):
+        if count > 0 and not list_ids:
+            raise ValueError("list_ids must not be empty when creating {} cards".format(count))
+        return await self.api.gather(
+            (self.api.create_card_post({"name": f"{name_prefix} {i + 1}", "idList": list_ids[i % len(list_ids)],
+                                        "key": trello_KEY, "token": trello_Token})
+             for i in range(count)),
+            limit,
+        )
+
+    # 同時刪除多個看板
+    async def delete_trello_boards(self, board_ids, limit=None):
+        params = {"key": trello_KEY, "token": trello_Token}
+        return await self.api.gather((self.api.delete_board_delete(board_id, params) for board_id in board_ids), limit)
+
+    # 把看板還原成建立時的狀態: 刪除所有卡片, 封存多出來的列表, 名稱改回來; 有請求失敗時raise HTTPError
+    async def reset_trello_board(self, board_id, name, keep_list_ids, limit=None):
+        params = {"key": trello_KEY, "token": trello_Token}
+        lists, cards = await asyncio.gather(
+            self.api.get_board_lists(board_id, params), self.api.get_board_cards(board_id, params))
+        lists.raise_for_status()
+        cards.raise_for_status()
+        calls = [self.api.delete_card_delete(card["id"], params) for card in cards.json()]
+        calls += [self.api.close_list_put(item["id"], params) for item in lists.json()
+                  if item["id"] not in keep_list_ids]
+        calls.append(self.api.update_board_put(board_id, dict(params, name=name)))
+        responses = await self.api.gather(calls, limit)
+        # 任何一個請求失敗都表示看板沒有還原乾淨
+        for res in responses:
+            res.raise_for_status()
+        return responses
+
+    def close(self):
+        self.api.close()
+
 # ----------------------------------------------------------------
 
 
@@ -172,6 +689,28 @@ class ApiService:
         response_json = response.json()
         return response_json
 
+    # 建立一個看板及其列表與卡片(非同步併發), 用於準備大量測試資料
+    def create_board_with_cards(self, list_count, card_count, concurrency=10):
+        async def build():
+            operation = AsyncAPIOperation(self.api_operation.api.api_root_url, concurrency)
+            try:
+                board = await operation.create_trello_board()
+                assert board.status_code == 200
+                lists = await operation.create_trello_lists(
+                    board.json()["id"], [f"list {i + 1}" for i in range(list_count)])
+                assert all(res.status_code == 200 for res in lists)
+                cards = await operation.create_trello_cards([res.json()["id"] for res in lists], card_count)
+                assert all(res.status_code == 200 for res in cards)
+                return {
+                    "board": board.json(),
+                    "lists": [res.json() for res in lists],
+                    "cards": [res.json() for res in cards],
+                }
+            finally:
+                operation.close()
+
+        return asyncio.run(build())
+
 # ----------------------------------------------------------------
 
 
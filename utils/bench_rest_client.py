@@ -0,0 +1,131 @@
+"""RestClient.request 每次請求額外開銷的micro-benchmark.
+
+不連網: 用假的transport adapter回傳固定的大型board json,
+比較舊版(每次都dumps/curlify/解析多次)與目前的lazy pipeline.
+
+    python -m utils.bench_rest_client [--requests 200] [--cards 500]
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+import allure
+import curlify
+import requests
+from requests.adapters import BaseAdapter
+
+import test_trello_api_framework as framework
+from common.logger import logger
+from common.transport import Transport
+
+
+# 固定回傳同一份body的adapter
+class CannedAdapter(BaseAdapter):
+    def __init__(self, body):
+        super().__init__()
+        self.body = body
+
+    def send(self, request, **kwargs):
+        res = requests.Response()
+        res.status_code = 200
+        res._content = self.body
+        res.headers["Content-Type"] = "application/json; charset=utf-8"
+        res.encoding = "utf-8"
+        res.request = request
+        res.url = request.url
+        return res
+
+    def close(self):
+        pass
+
+
+def make_board_body(cards):
+    board = {
+        "id": "5f0c" * 6,
+        "name": framework.trello_Board_name,
+        "cards": [
+            {"id": "{:024x}".format(i), "name": f"card {i}", "desc": "x" * 80, "idList": "a" * 24,
+             "labels": [{"id": "b" * 24, "color": "green", "name": "label"}]}
+            for i in range(cards)
+        ],
+    }
+    return json.dumps(board).encode("utf-8")
+
+
+# 舊版request後處理流程的複本, 作為比較基準
+def legacy_post_process(url, method, params, headers, res):
+    try:
+        allure.attach(f'{curlify.to_curl(res.request)}', 'requests curl')
+    except Exception as e:
+        logger.error(f"Curlify error: {e}")
+    logger.info("api url ==>> {}".format(url))
+    logger.info("api method==>> {}".format(method))
+    logger.info("status code ==>> {}".format(res.status_code))
+    logger.info("api request header ==>> {}".format(json.dumps(headers, indent=4, ensure_ascii=False)))
+    allure.attach(f'{method} {url} \nStatus Code: {res.status_code} ', 'requests method/url/time/header')
+    if params:
+        logger.info("api request params ==>> {}".format(json.dumps(params, indent=4, ensure_ascii=False)))
+        allure.attach(f'{json.dumps(params, indent=4, ensure_ascii=False)}', 'requests params')
+    if res.text:
+        allure.attach(json.dumps(res.json(), indent=4, ensure_ascii=False), f'{url} Response body')
+    res.json()
+    logger.info("api response json ==>> {}".format(json.dumps(res.json(), indent=4, ensure_ascii=False)))
+    # service層再解析一次
+    return res.json()
+
+
+def run_legacy(session, url, params, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        res = session.get(url, params=params, timeout=35)
+        legacy_post_process(url, "GET", params, {}, res)
+    return (time.perf_counter() - start) / count
+
+
+def run_current(client, params, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        res = client.get("/boards/bench", params=params)
+        res.json()
+    return (time.perf_counter() - start) / count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--cards", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    root = "https://bench.invalid/1"
+    adapter = CannedAdapter(make_board_body(args.cards))
+    # 不套用Trello限流, 只量測client本身的開銷
+    client = framework.RestClient(root, Transport.from_settings(rate_limiter=None))
+    client.session.mount("https://", adapter)
+    session = requests.session()
+    session.mount("https://", adapter)
+    params = {"name": framework.trello_Board_name, "key": "k" * 32, "token": "t" * 64}
+
+    # 輸出到devnull, 只量測格式化與序列化本身
+    handlers, level = logger.handlers[:], logger.level
+    devnull = open(os.devnull, "w")
+    logger.handlers = [logging.StreamHandler(devnull)]
+    try:
+        print(f"{'scenario':<28}{'legacy ms/req':>16}{'current ms/req':>16}{'speedup':>10}")
+        for name, log_level in (("logger INFO, allure auto", logging.INFO),
+                                ("logger WARNING, allure auto", logging.WARNING)):
+            logger.setLevel(log_level)
+            run_legacy(session, root + "/boards/bench", params, 5)
+            run_current(client, params, 5)
+            legacy = run_legacy(session, root + "/boards/bench", params, args.requests) * 1000
+            current = run_current(client, params, args.requests) * 1000
+            print(f"{name:<28}{legacy:>16.3f}{current:>16.3f}{legacy / current:>9.1f}x")
+    finally:
+        logger.handlers = handlers
+        logger.setLevel(level)
+        devnull.close()
+
+
+if __name__ == "__main__":
+    main()
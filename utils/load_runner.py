@@ -0,0 +1,269 @@
+"""用operation層的流程做壓力測試.
+
+每個virtual user重複執行同一個scenario, 直到duration結束;
+ramp-up期間平均啟動所有user. 執行中定期輸出吞吐量/錯誤率/延遲,
+結束時輸出總結(含每個endpoint的p50/p95/p99).
+
+    python -m utils.load_runner --scenario create_board --users 20 --ramp-up 10 --duration 60
+    python -m utils.load_runner --scenario test_trello_api_framework:AsyncAPIOperation.create_trello_board \\
+        --mode async --users 50 --url http://127.0.0.1:8080/1
+    python -m utils.load_runner --scenario test_trello_api_framework:APIOperation.create_trello_list \\
+        --args '["<board id>", "load list"]' --users 10
+
+需要參數的方法用 --args 傳入json: list為位置參數, object為keyword參數.
+"""
+import argparse
+import asyncio
+import functools
+import importlib
+import inspect
+import json
+import logging
+import sys
+import threading
+import time
+
+from common import metrics
+from common.logger import logger
+
+# 內建scenario名稱 -> (同步, 非同步) operation方法
+SCENARIOS = {
+    "create_board": ("test_trello_api_framework:APIOperation.create_trello_board",
+                     "test_trello_api_framework:AsyncAPIOperation.create_trello_board"),
+}
+
+
+# 把 "module:Class.method" 轉成每個virtual user要執行的callable, args/kwargs每次呼叫都帶入
+def resolve_scenario(spec, url, mode, users, args=(), kwargs=None):
+    if spec in SCENARIOS:
+        spec = SCENARIOS[spec][mode == "async"]
+    kwargs = kwargs or {}
+    module_name, _, attr = spec.partition(":")
+    class_name, _, method_name = attr.partition(".")
+    cls = getattr(importlib.import_module(module_name), class_name)
+    # 參數不足時先報錯, 否則每次呼叫都是TypeError, 壓測結果只剩100%錯誤率
+    try:
+        inspect.signature(getattr(cls, method_name)).bind(None, *args, **kwargs)
+    except TypeError as e:
+        raise ValueError("Scenario {} cannot be called with args={!r} kwargs={!r}: {}".format(
+            spec, list(args), kwargs, e)) from None
+    if mode == "async":
+        # 所有user共用一個async operation, 連線池/執行緒數等於user數
+        operation = cls(url, users)
+        return (lambda: functools.partial(getattr(operation, method_name), *args, **kwargs),
+                getattr(operation, "close", None))
+    return lambda: functools.partial(getattr(cls(url), method_name), *args, **kwargs), None
+
+
+# 壓測統計, 整體與每個報告區間分開計算
+class LoadStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.errors = 0
+        self.error_types = {}
+        self.interval_latencies = []
+        self.interval_errors = 0
+        self.active_users = 0
+
+    # error: None表示成功, 否則為錯誤種類(例外名稱或HTTP狀態)
+    def record(self, latency, error=None):
+        with self._lock:
+            self.latencies.append(latency)
+            self.interval_latencies.append(latency)
+            if error is not None:
+                self.errors += 1
+                self.interval_errors += 1
+                self.error_types[error] = self.error_types.get(error, 0) + 1
+
+    def user_started(self):
+        with self._lock:
+            self.active_users += 1
+
+    def take_interval(self):
+        with self._lock:
+            latencies, errors = self.interval_latencies, self.interval_errors
+            self.interval_latencies, self.interval_errors = [], 0
+        return sorted(latencies), errors
+
+
+def is_ok(result):
+    status_code = getattr(result, "status_code", None)
+    return status_code is None or status_code < 400
+
+
+class LoadRunner:
+    def __init__(self, flow_factory, users=1, ramp_up=0.0, duration=10.0, mode="thread", report_interval=5.0,
+                 out=sys.stdout):
+        self.flow_factory = flow_factory
+        self.users = users
+        self.ramp_up = ramp_up
+        self.duration = duration
+        self.mode = mode
+        self.report_interval = report_interval
+        self.out = out
+        self.stats = LoadStats()
+        self.collector = metrics.MetricsCollector()
+        self.started_at = None
+        self.stop_at = None
+
+    def _start_delay(self, index):
+        return self.ramp_up * index / self.users if self.users > 1 else 0.0
+
+    def _thread_user(self, index):
+        time.sleep(self._start_delay(index))
+        flow = self.flow_factory()
+        self.stats.user_started()
+        while time.monotonic() < self.stop_at:
+            start = time.perf_counter()
+            error = None
+            try:
+                result = flow()
+            except Exception as e:
+                error = type(e).__name__
+            else:
+                if not is_ok(result):
+                    error = "HTTP {}".format(result.status_code)
+            self.stats.record(time.perf_counter() - start, error)
+
+    async def _async_user(self, index):
+        await asyncio.sleep(self._start_delay(index))
+        flow = self.flow_factory()
+        self.stats.user_started()
+        while time.monotonic() < self.stop_at:
+            start = time.perf_counter()
+            error = None
+            try:
+                result = await flow()
+            except Exception as e:
+                error = type(e).__name__
+            else:
+                if not is_ok(result):
+                    error = "HTTP {}".format(result.status_code)
+            self.stats.record(time.perf_counter() - start, error)
+
+    async def _async_main(self):
+        await asyncio.gather(*(self._async_user(i) for i in range(self.users)))
+
+    def _report_loop(self, done):
+        while not done.wait(self.report_interval):
+            latencies, errors = self.stats.take_interval()
+            count = len(latencies)
+            self.out.write(
+                "[{:>7.1f}s] users {:>4} | {:>8.1f} it/s | errors {:>5.1%} | p50 {:>8.1f} ms | p95 {:>8.1f} ms\n".format(
+                    time.monotonic() - self.started_at, self.stats.active_users, count / self.report_interval,
+                    errors / count if count else 0.0, metrics.percentile(latencies, 50) * 1000,
+                    metrics.percentile(latencies, 95) * 1000))
+            self.out.flush()
+
+    def run(self):
+        import test_trello_api_framework as framework
+
+        # 壓測時不產生allure/curl附件, 只輸出warning以上的log
+        attach_mode, level = framework.ALLURE_ATTACH_MODE, logger.level
+        framework.ALLURE_ATTACH_MODE = "off"
+        logger.setLevel(logging.WARNING)
+        metrics.add_listener(self.collector)
+        done = threading.Event()
+        reporter = threading.Thread(target=self._report_loop, args=(done,), daemon=True)
+        self.started_at = time.monotonic()
+        self.stop_at = self.started_at + self.duration
+        reporter.start()
+        try:
+            if self.mode == "async":
+                asyncio.run(self._async_main())
+            else:
+                threads = [threading.Thread(target=self._thread_user, args=(i,), daemon=True)
+                           for i in range(self.users)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        finally:
+            done.set()
+            reporter.join()
+            metrics.remove_listener(self.collector)
+            framework.ALLURE_ATTACH_MODE = attach_mode
+            logger.setLevel(level)
+        return self.report(time.monotonic() - self.started_at)
+
+    def report(self, elapsed):
+        latencies = sorted(self.stats.latencies)
+        count = len(latencies)
+        endpoints = self.collector.report()["endpoints"]
+        requests = sum(entry["count"] for entry in endpoints.values())
+        return {
+            "mode": self.mode,
+            "users": self.users,
+            "ramp_up": self.ramp_up,
+            "duration": round(elapsed, 3),
+            "iterations": count,
+            "errors": self.stats.errors,
+            "error_rate": round(self.stats.errors / count, 4) if count else 0.0,
+            "error_types": dict(self.stats.error_types),
+            "throughput": round(count / elapsed, 3) if elapsed else 0.0,
+            "requests": requests,
+            "request_throughput": round(requests / elapsed, 3) if elapsed else 0.0,
+            "latency_ms": {
+                "p50": round(metrics.percentile(latencies, 50) * 1000, 3),
+                "p95": round(metrics.percentile(latencies, 95) * 1000, 3),
+                "p99": round(metrics.percentile(latencies, 99) * 1000, 3),
+                "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+            },
+            "endpoints": endpoints,
+        }
+
+
+def format_summary(report):
+    latency = report["latency_ms"]
+    lines = [
+        "mode {mode}, {users} users, ramp-up {ramp_up}s, ran {duration}s".format(**report),
+        "iterations {} ({:.1f} it/s), requests {} ({:.1f} req/s), errors {} ({:.2%})".format(
+            report["iterations"], report["throughput"], report["requests"], report["request_throughput"],
+            report["errors"], report["error_rate"]),
+    ]
+    if report["error_types"]:
+        lines.append("error types: " + ", ".join("{} x{}".format(k, v) for k, v in report["error_types"].items()))
+    lines.append("scenario latency p50 {p50:.1f} ms, p95 {p95:.1f} ms, p99 {p99:.1f} ms, max {max:.1f} ms".format(
+        **latency))
+    lines.append("")
+    lines.append(metrics.format_report({"endpoints": report["endpoints"], "tests": {}}))
+    return "\n".join(lines)
+
+
+def main(argv=None, out=sys.stdout):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", default="create_board",
+                        help="內建名稱({})或 module:Class.method".format(", ".join(SCENARIOS)))
+    parser.add_argument("--args", type=json.loads, default=[],
+                        help="scenario的參數(json), list為位置參數, object為keyword參數")
+    parser.add_argument("--url", default=None, help="api root url, 預設為trello_env.ini的設定")
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="秒")
+    parser.add_argument("--duration", type=float, default=10.0, help="秒")
+    parser.add_argument("--mode", choices=("thread", "async"), default="thread")
+    parser.add_argument("--report-interval", type=float, default=5.0, help="秒")
+    parser.add_argument("--json", default=None, help="把最終結果寫入json檔")
+    args = parser.parse_args(argv)
+
+    import test_trello_api_framework as framework
+
+    scenario_args, scenario_kwargs = (((), args.args) if isinstance(args.args, dict) else (args.args, None))
+    flow_factory, close = resolve_scenario(args.scenario, args.url or framework.trello_URL, args.mode, args.users,
+                                           scenario_args, scenario_kwargs)
+    runner = LoadRunner(flow_factory, users=args.users, ramp_up=args.ramp_up, duration=args.duration,
+                        mode=args.mode, report_interval=args.report_interval, out=out)
+    try:
+        report = runner.run()
+    finally:
+        if close is not None:
+            close()
+    out.write(format_summary(report) + "\n")
+    if args.json:
+        with open(args.json, "w", encoding="UTF-8") as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import collections
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+
+# 本地假Trello server, 讓case不需要連網也能跑
+class StubTrelloServer:
+    def __init__(self, host="127.0.0.1", port=0, delay=0.0):
+        self.resources = {"boards": {}, "lists": {}, "cards": {}, "labels": {}}
+        self.delay = delay
+        self.request_count = 0
+        self.batch_count = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # 預先排好的錯誤回應(status, headers, method), 依序回給接下來(符合method)的請求
+        self.scripted = collections.deque()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/1"
+
+    @property
+    def boards(self):
+        return self.resources["boards"]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def new_id(self):
+        return "{:024x}".format(next(self._ids))
+
+    # method為None時不分method
+    def fail_next(self, status, count=1, headers=None, method=None):
+        for _ in range(count):
+            self.scripted.append((status, headers or {}, method))
+
+    def _pop_scripted(self, method):
+        for entry in self.scripted:
+            if entry[2] in (None, method):
+                self.scripted.remove(entry)
+                return entry
+        return None
+
+    # 模擬網路延遲並記錄同時處理中的請求數, 回傳(status, body, headers)
+    def handle(self, method, path, params, body):
+        with self._lock:
+            self.request_count += 1
+            scripted = self._pop_scripted(method)
+            if scripted is not None:
+                status, headers, _ = scripted
+                return status, "scripted error {}".format(status), headers
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                time.sleep(self.delay)
+            with self._lock:
+                status, payload = self.dispatch(method, path, params, body)
+                return status, payload, {}
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    # 依照method/path分派, 回傳(status, body)
+    def dispatch(self, method, path, params, body):
+        parts = [p for p in path.split("/") if p]
+        if parts[:1] == ["1"]:
+            parts = parts[1:]
+        fields = dict(params, **body)
+        if parts == ["batch"] and method == "GET":
+            return 200, self.batch(params.get("urls", ""))
+        if not parts or parts[0] not in self.resources:
+            return 404, "Cannot {} /1/{}".format(method, "/".join(parts))
+        collection = self.resources[parts[0]]
+        if len(parts) == 1 and method == "POST":
+            return 200, self.create(parts[0], fields)
+        item = collection.get(parts[1]) if len(parts) > 1 else None
+        if item is None:
+            return 404, "The requested resource was not found."
+        if len(parts) == 3 and method == "GET":
+            children = self.resources.get(parts[2], {}).values()
+            return 200, [child for child in children
+                         if child.get("id" + parts[0][:-1].capitalize()) == item["id"] and not child["closed"]]
+        if len(parts) == 3 and method == "PUT":
+            value = fields.get("value")
+            item[parts[2]] = value in (True, "true") if parts[2] == "closed" else value
+            return 200, item
+        if len(parts) == 2 and method == "GET":
+            if params.get("fields"):
+                # 和Trello一樣, fields以逗號分隔並且一定帶id
+                names = params["fields"].split(",")
+                return 200, {k: v for k, v in item.items() if k == "id" or k in names}
+            return 200, item
+        if len(parts) == 2 and method == "PUT":
+            item.update({k: v for k, v in fields.items() if k not in ("key", "token")})
+            return 200, item
+        if len(parts) == 2 and method == "DELETE":
+            del collection[parts[1]]
+            return 200, {"_value": None}
+        return 404, "Cannot {} /1/{}".format(method, "/".join(parts))
+
+    # 模擬GET /1/batch: 最多10個url, 每筆成功為{"200": body}, 失敗為{"statusCode": ...}
+    def batch(self, urls):
+        self.batch_count += 1
+        urls = [url for url in urls.split(",") if url]
+        if len(urls) > 10:
+            return [{"statusCode": 400, "name": "ValidationError", "message": "Too many urls"}]
+        results = []
+        for url in urls:
+            split = urlsplit(url)
+            status, payload = self.dispatch("GET", split.path, dict(parse_qsl(split.query)), {})
+            if status == 200:
+                results.append({"200": payload})
+            else:
+                results.append({"statusCode": status, "name": "NotFoundError", "message": payload})
+        return results
+
+    def create(self, kind, fields):
+        item = {k: v for k, v in fields.items() if k not in ("key", "token")}
+        item.update({"id": self.new_id(), "closed": False})
+        if kind == "cards" and item.get("idList") in self.resources["lists"]:
+            item["idBoard"] = self.resources["lists"][item["idList"]]["idBoard"]
+        self.resources[kind][item["id"]] = item
+        return item
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # header與body一起送出, 避免keep-alive時Nagle/delayed ACK造成約40ms延遲
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def _handle(self):
+                split = urlsplit(self.path)
+                params = dict(parse_qsl(split.query))
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                try:
+                    body = json.loads(raw) if raw else {}
+                except ValueError:
+                    body = dict(parse_qsl(raw.decode("utf-8")))
+                status, payload, headers = server.handle(self.command, split.path, params, body)
+                if isinstance(payload, str):
+                    data, content_type = payload.encode("utf-8"), "text/plain; charset=utf-8"
+                else:
+                    data, content_type = json.dumps(payload).encode("utf-8"), "application/json; charset=utf-8"
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_DELETE = do_PATCH = _handle
+
+            def log_message(self, *args):
+                pass
+
+        return Handler